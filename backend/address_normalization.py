@@ -0,0 +1,161 @@
+import re
+
+# USPS standard street suffix abbreviations
+STREET_SUFFIXES = {
+    "alley": "aly",
+    "avenue": "ave",
+    "av": "ave",
+    "boulevard": "blvd",
+    "circle": "cir",
+    "court": "ct",
+    "crossing": "xing",
+    "drive": "dr",
+    "expressway": "expy",
+    "highway": "hwy",
+    "lane": "ln",
+    "parkway": "pkwy",
+    "place": "pl",
+    "plaza": "plz",
+    "road": "rd",
+    "square": "sq",
+    "street": "st",
+    "terrace": "ter",
+    "trail": "trl",
+    "way": "wy",
+}
+
+DIRECTIONALS = {
+    "north": "n",
+    "south": "s",
+    "east": "e",
+    "west": "w",
+    "northeast": "ne",
+    "northwest": "nw",
+    "southeast": "se",
+    "southwest": "sw",
+}
+
+# Single-word state names (two-word states are rare enough in our lists to leave as is)
+STATES = {
+    "alabama": "al",
+    "alaska": "ak",
+    "arizona": "az",
+    "arkansas": "ar",
+    "california": "ca",
+    "colorado": "co",
+    "connecticut": "ct",
+    "delaware": "de",
+    "florida": "fl",
+    "georgia": "ga",
+    "hawaii": "hi",
+    "idaho": "id",
+    "illinois": "il",
+    "indiana": "in",
+    "iowa": "ia",
+    "kansas": "ks",
+    "kentucky": "ky",
+    "louisiana": "la",
+    "maine": "me",
+    "maryland": "md",
+    "massachusetts": "ma",
+    "michigan": "mi",
+    "minnesota": "mn",
+    "mississippi": "ms",
+    "missouri": "mo",
+    "montana": "mt",
+    "nebraska": "ne",
+    "nevada": "nv",
+    "ohio": "oh",
+    "oklahoma": "ok",
+    "oregon": "or",
+    "pennsylvania": "pa",
+    "tennessee": "tn",
+    "texas": "tx",
+    "utah": "ut",
+    "vermont": "vt",
+    "virginia": "va",
+    "washington": "wa",
+    "wisconsin": "wi",
+    "wyoming": "wy",
+}
+
+# "Apt 4", "Apt. 4B", "Unit #12", "Suite 200", "# 3", "#3-B"
+UNIT_PATTERN = re.compile(
+    r"(?:\b(?:apartment|apt|unit|suite|ste|room|rm|building|bldg)\b\.?\s*#?|#)\s*([a-z0-9-]+)"
+)
+PUNCTUATION_PATTERN = re.compile(r"[^a-z0-9\s]")
+
+
+def normalize_address(address, keep_unit=False):
+    """
+    Canonical form of an address for use as a cache key.
+
+    Lowercases, removes punctuation, abbreviates street suffixes, directionals and state
+    names and pulls out the unit number. Units are dropped by default since every unit in a
+    building geocodes to the same point; keep_unit=True appends it as "unit <n>".
+    """
+    address = address.lower()
+
+    units = UNIT_PATTERN.findall(address)
+    address = UNIT_PATTERN.sub(" ", address)
+
+    address = PUNCTUATION_PATTERN.sub(" ", address)
+
+    tokens = []
+    for token in address.split():
+        token = STREET_SUFFIXES.get(token, token)
+        token = DIRECTIONALS.get(token, token)
+        token = STATES.get(token, token)
+        tokens.append(token)
+
+    if keep_unit and units:
+        tokens += ["unit", units[0].strip("-")]
+
+    return " ".join(tokens)
+
+
+def trigrams(key):
+    """Set of character trigrams of a normalized address, padded so word boundaries count."""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def street_key(key):
+    """
+    Split a normalized address into (street, rest) for fuzzy matching, or None.
+
+    street runs from the first house number up to the street suffix, with any
+    directional right after it ("123 w johnson st", "500 main st nw"); rest is
+    everything else (city, state, zip). Near-duplicates must have the exact same
+    street, so only the rest is compared. Addresses without a house number or a
+    suffix are never fuzzy matched.
+    """
+    tokens = key.split()
+    suffixes = set(STREET_SUFFIXES.values())
+    directionals = set(DIRECTIONALS.values())
+
+    start = next((i for i, token in enumerate(tokens) if token.isdigit()), None)
+    if start is None:
+        return None
+
+    end = next((i for i in range(start + 1, len(tokens)) if tokens[i] in suffixes), None)
+    if end is None:
+        return None
+
+    end += 1
+    if end < len(tokens) and tokens[end] in directionals:
+        end += 1
+
+    return " ".join(tokens[start:end]), " ".join(tokens[:start] + tokens[end:])
+
+
+def house_numbers(key):
+    """Numeric tokens of a normalized address. Fuzzy matches must agree on these exactly."""
+    return [token for token in key.split() if any(c.isdigit() for c in token)]
+
+
+def similarity(key_a, key_b):
+    """Jaccard similarity of the trigram sets of two normalized addresses."""
+    grams_a = trigrams(key_a)
+    grams_b = trigrams(key_b)
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
@@ -0,0 +1,528 @@
+from typing import Any
+import asyncio
+import hashlib
+import json
+import uuid
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+# Load environment variables before the project modules, which read their settings on import
+load_dotenv()
+
+import bpn_osm_and_kmeans
+import elbow_method
+import grouping_store
+import ingestion
+import jobs
+import pipeline
+import rendering
+
+import pandas as pd
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Body, Query, Request, Depends
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import Response, StreamingResponse
+
+app = FastAPI()
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:5173"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["ETag"],
+)
+
+# Groupings and routes are large, repetitive JSON; event streams are never compressed
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+# Saved groupings: Supabase, or a local SQLite file with GROUPINGS_BACKEND=sqlite
+store = grouping_store.create_store()
+store.start()
+
+def read_spreadsheet(file: UploadFile, contents: bytes, extra_columns: tuple[str, ...] = ()) -> tuple[pd.DataFrame, list[dict[str, Any]]]:
+    """Parse an uploaded CSV/Excel file with ingestion.read_spreadsheet, as a 400 if it is unusable."""
+    if file.filename == None: # Ensure a file was actually uploaded even though FastAPI should handle this case
+        raise HTTPException(status_code=400, detail="No file uploaded")
+
+    try:
+        return ingestion.read_spreadsheet(file.filename, contents, extra_columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def validate_distance_backend(distance_backend: str | None) -> None:
+    if distance_backend is not None and distance_backend not in DISTANCE_BACKENDS:
+        raise HTTPException(status_code=400, detail=f"distance_backend must be one of {', '.join(DISTANCE_BACKENDS)}")
+
+
+def validate_balance_by(balance_by: str | None) -> None:
+    if balance_by is not None and balance_by not in BALANCE_MODES:
+        raise HTTPException(status_code=400, detail=f"balance_by must be one of {', '.join(BALANCE_MODES)}")
+
+
+def validate_engine(engine: str | None) -> None:
+    if engine is not None and engine not in ROUTING_ENGINES:
+        raise HTTPException(status_code=400, detail=f"engine must be one of {', '.join(ROUTING_ENGINES)}")
+
+
+def build_solver_settings(
+    first_solution_strategy: str | None,
+    guided_local_search: bool | None,
+    seconds_per_stop: float | None,
+    max_seconds: float | None,
+    stall_seconds: float | None,
+) -> dict[str, Any]:
+    """Solver settings of an upload; None means the default (bpn_osm_and_kmeans.DEFAULT_SOLVER_SETTINGS)."""
+    if first_solution_strategy is not None and first_solution_strategy not in bpn_osm_and_kmeans.FIRST_SOLUTION_STRATEGIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"first_solution_strategy must be one of {', '.join(bpn_osm_and_kmeans.FIRST_SOLUTION_STRATEGIES)}",
+        )
+
+    return {
+        "first_solution_strategy": first_solution_strategy,
+        "guided_local_search": guided_local_search,
+        "seconds_per_stop": seconds_per_stop,
+        "max_seconds": max_seconds,
+        "stall_seconds": stall_seconds,
+    }
+
+
+def save_grouping_record(job_id: str, result: dict[str, Any]) -> None:
+    """Auto-save a finished upload job to the database in the background (see GroupingStore.save_later)."""
+    if not result["groups"]:
+        return
+
+    store.save_later({
+        "filename": result["filename"],
+        "number_of_groups": len(result["groups"]),
+        "columns": result["columns"],
+        "groups": result["groups"],
+        "routes": result.get("routes"),
+    })
+
+
+# Upload jobs run in a pool of worker processes so the solver never blocks the API
+job_manager = jobs.JobManager(on_complete=save_grouping_record)
+job_manager.start()
+JOB_EVENTS_POLL_SECONDS = 0.5
+UPLOAD_TASK = "pipeline:run_pipeline"
+REROUTE_TASK = "pipeline:run_incremental"
+DISTANCE_BACKENDS = ("osrm", "haversine", "hybrid")
+BALANCE_MODES = ("stops", "time")
+ROUTING_ENGINES = ("clusters", "vrp")
+SUGGEST_K_METRICS = ("inertia", "silhouette")
+
+# GET /groupings lists these columns only, newest first, one page at a time
+GROUPING_SUMMARY_COLUMNS = "id, filename, number_of_groups, created_at"
+GROUPINGS_PAGE_SIZE = 50
+MAX_GROUPINGS_PAGE_SIZE = 200
+
+
+async def wait_for_job(job_id: str) -> dict[str, Any]:
+    """Result of a job once it finishes, or a 500 if it failed or was cancelled."""
+    # wait for the worker without holding up other requests
+    while job_manager.store.get_status(job_id) not in jobs.FINISHED_STATUSES:
+        await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+
+    job = job_manager.store.get(job_id)
+
+    if job["status"] != "done":
+        raise HTTPException(status_code=500, detail=f"Failed to process spreadsheet: {job['error'] or job['status']}")
+
+    return job["result"]
+
+
+async def upload_form(
+    number_of_groups: int = Form(..., gt=0),
+    file: UploadFile = File(...),
+    distance_backend: str | None = Form(None),
+    balance_by: str | None = Form(None),
+    weight_column: str | None = Form(None),
+    engine: str | None = Form(None),
+    first_solution_strategy: str | None = Form(None),
+    guided_local_search: bool | None = Form(None),
+    seconds_per_stop: float | None = Form(None, gt=0),
+    max_seconds: float | None = Form(None, gt=0),
+    stall_seconds: float | None = Form(None, gt=0),
+) -> dict[str, Any]:
+    """
+    Form of /upload-spreadsheet and /jobs, validated, with the spreadsheet read:
+    task_args are the arguments of UPLOAD_TASK, row_errors those of read_spreadsheet.
+    """
+    validate_distance_backend(distance_backend)
+    validate_balance_by(balance_by)
+    validate_engine(engine)
+    solver_settings = build_solver_settings(first_solution_strategy, guided_local_search, seconds_per_stop, max_seconds, stall_seconds)
+    df, row_errors = read_spreadsheet(file, await file.read(), (weight_column or pipeline.SERVICE_MINUTES_COLUMN,))
+
+    return {
+        "task_args": (df, file.filename, number_of_groups, distance_backend, balance_by, weight_column, engine, solver_settings),
+        "row_errors": row_errors,
+    }
+
+
+@app.post("/upload-spreadsheet")
+async def upload_spreadsheet(upload: dict[str, Any] = Depends(upload_form)) -> dict[str, Any]:
+    job_id = job_manager.submit(UPLOAD_TASK, *upload["task_args"])
+
+    return {**await wait_for_job(job_id), "row_errors": upload["row_errors"]}
+
+
+@app.post("/jobs")
+async def create_upload_job(upload: dict[str, Any] = Depends(upload_form)) -> dict[str, Any]:
+    """
+    Same as /upload-spreadsheet but returns a job id immediately.
+    Follow progress with GET /jobs/{job_id}/events (SSE) or poll GET /jobs/{job_id}.
+    """
+    job_id = job_manager.submit(UPLOAD_TASK, *upload["task_args"])
+
+    return {
+        "success": True,
+        "job_id": job_id,
+        "row_errors": upload["row_errors"],
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> dict[str, Any]:
+    """
+    Status of an upload job, the latest data of every finished stage and the final result.
+    """
+    job = job_manager.store.get(job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str) -> dict[str, Any]:
+    """
+    Result of a finished upload job.
+    """
+    status = job_manager.store.get_status(job_id)
+
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if status != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {status}")
+
+    return job_manager.store.get_result(job_id)
+
+
+@app.get("/jobs/{job_id}/map")
+async def get_job_map(job_id: str, format: str = "png") -> Response:
+    """
+    Map of a finished upload job's groups and routes as png, svg or geojson.
+    """
+    if format not in rendering.MAP_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(rendering.MAP_FORMATS)}")
+
+    status = job_manager.store.get_status(job_id)
+
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if status != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {status}")
+
+    result = job_manager.store.get_result(job_id)
+
+    if not result.get("map"):
+        raise HTTPException(status_code=404, detail="Job has no map data")
+
+    content = await asyncio.to_thread(rendering.render_map, result["map"], format)
+
+    return Response(content=content, media_type=rendering.MAP_FORMATS[format])
+
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str) -> dict[str, Any]:
+    """
+    Cancel a queued job, or ask a running job to stop at its next stage.
+    """
+    status = job_manager.store.get_status(job_id)
+
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if status in jobs.FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job is already {status}")
+
+    return {
+        "success": True,
+        "status": job_manager.store.cancel(job_id),
+    }
+
+
+@app.post("/jobs/{job_id}/retry")
+async def retry_job(job_id: str) -> dict[str, Any]:
+    """
+    Queue a failed or cancelled job again.
+    """
+    status = job_manager.store.get_status(job_id)
+
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if not job_manager.store.retry(job_id):
+        raise HTTPException(status_code=409, detail=f"Only failed or cancelled jobs can be retried, job is {status}")
+
+    return {
+        "success": True,
+        "status": "queued",
+    }
+
+
+@app.get("/jobs/{job_id}/events")
+async def get_job_events(job_id: str) -> StreamingResponse:
+    """
+    Server-sent events for an upload job, one event per progress update.
+    The stream ends once the job is done, failed or cancelled.
+    """
+    if job_manager.store.get_status(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        last_seq = 0
+
+        while True:
+            status = job_manager.store.get_status(job_id)
+            events = job_manager.store.events_since(job_id, last_seq)
+
+            for event in events:
+                last_seq = event["seq"]
+                yield f"id: {event['seq']}\nevent: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+
+            if status in jobs.FINISHED_STATUSES:
+                break
+
+            await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@app.post("/suggest-groups")
+async def suggest_groups(
+    file: UploadFile = File(...),
+    min_k: int = Form(1, gt=0),
+    max_k: int = Form(elbow_method.DEFAULT_MAX_K, gt=0),
+    metric: str = Form("inertia"),
+    sample_size: int | None = Form(None, gt=0),
+) -> dict[str, Any]:
+    """
+    Suggest a number_of_groups for a spreadsheet: the inertia or silhouette score of
+    every candidate K and the recommended K.
+    """
+    if metric not in SUGGEST_K_METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of {', '.join(SUGGEST_K_METRICS)}")
+
+    df, row_errors = read_spreadsheet(file, await file.read())
+
+    def suggest():
+        geocoded_data = bpn_osm_and_kmeans.geocode_addresses(pipeline.spreadsheet_addresses(df))
+        x = [[entry["latitude"], entry["longitude"]] for entry in geocoded_data]
+        return elbow_method.suggest_k(x, min_k, max_k, metric, sample_size)
+
+    try:
+        suggestion = await asyncio.to_thread(suggest)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "success": True,
+        "filename": file.filename,
+        "row_errors": row_errors,
+        **suggestion,
+    }
+
+
+@app.post("/save-grouping")
+async def save_grouping(
+    data: dict[str, Any] = Body(...)
+) -> dict[str, Any]:
+    """
+    Save a grouping to the database.
+    Expected data format:
+    {
+        "filename": str,
+        "number_of_groups": int,
+        "columns": list[str],
+        "groups": list[list[dict]],
+        "routes": list[dict] (optional, as returned by /upload-spreadsheet)
+    }
+    """
+    try:
+        grouping_id = await store.insert({
+            "filename": data["filename"],
+            "number_of_groups": data["number_of_groups"],
+            "columns": data["columns"],
+            "groups": data["groups"],
+            "routes": data.get("routes"),
+        })
+        
+        return {
+            "success": True,
+            "id": grouping_id,
+            "message": "Grouping saved successfully"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to save grouping: {str(e)}")
+
+
+@app.get("/groupings")
+async def get_groupings(
+    limit: int = Query(GROUPINGS_PAGE_SIZE, gt=0, le=MAX_GROUPINGS_PAGE_SIZE),
+    before: str | None = None,
+) -> dict[str, Any]:
+    """
+    List saved groupings, newest first: id, filename, number_of_groups and created_at only.
+    Pass the returned next_cursor as `before` for the next page; it is None on the last page.
+    Load a whole grouping with GET /groupings/{grouping_id}.
+    """
+    cursor = None
+    if before:
+        # "<created_at>,<id>": groupings saved in one batch share their created_at
+        created_at, _, grouping_id = before.partition(",")
+        # both parts end up in the store's filter, so only a timestamp and a UUID get through
+        try:
+            datetime.fromisoformat(created_at)
+            grouping_id = str(uuid.UUID(grouping_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        cursor = (created_at, grouping_id)
+
+    try:
+        # one extra row tells whether there is another page
+        rows = await store.list(GROUPING_SUMMARY_COLUMNS, limit + 1, cursor)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve groupings: {str(e)}")
+
+    groupings = rows[:limit]
+
+    return {
+        "success": True,
+        "groupings": groupings,
+        "next_cursor": f"{groupings[-1]['created_at']},{groupings[-1]['id']}" if len(rows) > limit else None,
+    }
+
+
+@app.get("/groupings/{grouping_id}")
+async def get_grouping(grouping_id: str, request: Request) -> Response:
+    """
+    A saved grouping with its groups and routes.
+
+    The response has an ETag, so a client that sends it back in If-None-Match gets an
+    empty 304 while the grouping is unchanged. Large responses are gzipped.
+    """
+    try:
+        grouping = await store.get(grouping_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve grouping: {str(e)}")
+
+    if grouping is None:
+        raise HTTPException(status_code=404, detail="Grouping not found")
+
+    content = json.dumps({"success": True, "grouping": grouping}, separators=(",", ":")).encode()
+    etag = f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+@app.get("/groupings/{grouping_id}/map")
+async def get_grouping_map(grouping_id: str, format: str = "png") -> Response:
+    """
+    Map of a saved grouping's routes as png, svg or geojson, drawn from the saved routes.
+    """
+    if format not in rendering.MAP_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(rendering.MAP_FORMATS)}")
+
+    try:
+        grouping = await store.get(grouping_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve grouping: {str(e)}")
+
+    if grouping is None:
+        raise HTTPException(status_code=404, detail="Grouping not found")
+
+    if not grouping.get("routes"):
+        raise HTTPException(status_code=404, detail="Grouping has no saved routes")
+
+    map_data = bpn_osm_and_kmeans.saved_route_map_data(grouping["routes"])
+    content = await asyncio.to_thread(rendering.render_map, map_data, format)
+
+    return Response(content=content, media_type=rendering.MAP_FORMATS[format])
+
+
+@app.post("/groupings/{grouping_id}/reroute")
+async def reroute_grouping(
+    grouping_id: str,
+    file: UploadFile = File(...),
+    distance_backend: str | None = Form(None),
+) -> dict[str, Any]:
+    """
+    Update a saved grouping for a changed spreadsheet: unchanged stops keep their group
+    and route order, new stops are added to nearby groups and the routes are re-solved
+    starting from the saved ones. The result is saved as a new grouping.
+    """
+    validate_distance_backend(distance_backend)
+    df, row_errors = read_spreadsheet(file, await file.read())
+
+    try:
+        grouping = await store.get(grouping_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve grouping: {str(e)}")
+
+    if grouping is None:
+        raise HTTPException(status_code=404, detail="Grouping not found")
+
+    if not grouping.get("routes"):
+        raise HTTPException(status_code=409, detail="Grouping has no saved routes, upload the spreadsheet instead")
+
+    job_id = job_manager.submit(REROUTE_TASK, df, file.filename, grouping, distance_backend)
+
+    return {**await wait_for_job(job_id), "row_errors": row_errors}
+
+
+@app.delete("/groupings/{grouping_id}")
+async def delete_grouping(grouping_id: str) -> dict[str, Any]:
+    """
+    Delete a specific grouping by ID.
+    """
+    try:
+        deleted = await store.delete(grouping_id)
+        
+        if not deleted:
+            raise HTTPException(status_code=404, detail="Grouping not found")
+            
+        return {
+            "success": True,
+            "message": "Grouping deleted successfully"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to delete grouping: {str(e)}")
+
+
+
+@app.get("/health")
+async def health() -> dict[str, Any]:
+    """
+    Liveness check with the state of the groupings auto-save buffer: groupings saved,
+    failed batch attempts and groupings still waiting to be saved.
+    """
+    return {
+        "success": True,
+        "groupings": store.health(),
+    }
@@ -0,0 +1,70 @@
+"""
+Balanced assignment in balanced_kmeans: min-cost flow vs. the previous Hungarian assignment.
+
+The Hungarian version expands the N x K cost matrix to N x N and runs
+linear_sum_assignment on it, which is O(N^3) time and O(N^2) memory, so by default
+it is skipped above --hungarian-max points.
+
+Run from the backend directory:
+    python -m benchmarks.bench_balanced_kmeans --sizes 100 1000 10000 --clusters 10
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+import bpn_osm_and_kmeans
+
+
+def hungarian_assignment(cost, sizes):
+    """The assignment balanced_kmeans used before min-cost flow."""
+    expanded_cost = np.repeat(cost, repeats=sizes, axis=1)
+    row_ind, col_ind = linear_sum_assignment(expanded_cost)
+
+    # expanded column -> cluster
+    column_cluster = np.repeat(np.arange(len(sizes)), sizes)
+    cluster_labels = np.zeros(len(cost), dtype=int)
+    cluster_labels[row_ind] = column_cluster[col_ind]
+    return cluster_labels
+
+
+def measure(assign, cost, sizes):
+    tracemalloc.start()
+    start = time.perf_counter()
+    labels = assign(cost, sizes)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "seconds": round(elapsed, 3),
+        "peak_mb": round(peak / 1e6, 1),
+        "total_cost": float(cost[np.arange(len(cost)), labels].sum()),
+        "sizes_ok": bool(np.array_equal(np.bincount(labels, minlength=len(sizes)), sizes)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--clusters", type=int, default=10)
+    parser.add_argument("--hungarian-max", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+
+    for n in args.sizes:
+        x = np.column_stack([43.07 + rng.normal(0, 0.05, n), -89.40 + rng.normal(0, 0.05, n)])
+        centers = x[rng.choice(n, args.clusters, replace=False)]
+        cost = ((x[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        sizes = [n // args.clusters + (1 if i < n % args.clusters else 0) for i in range(args.clusters)]
+
+        result = {"points": n, "min_cost_flow": measure(bpn_osm_and_kmeans.balanced_assignment, cost, sizes)}
+        result["hungarian"] = measure(hungarian_assignment, cost, sizes) if n <= args.hungarian_max else "skipped"
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
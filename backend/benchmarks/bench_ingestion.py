@@ -0,0 +1,101 @@
+"""
+Spreadsheet ingestion: the previous read (every column, full-frame scans, Series
+concatenation) vs. ingestion.read_spreadsheet (required columns only, as strings).
+
+Builds a synthetic sheet with the address columns plus unrelated ones, some rows with
+a missing City or Address, and reports the parse time and the peak memory traced by
+tracemalloc for both ways of reading it.
+
+Run from the backend directory:
+    python -m benchmarks.bench_ingestion --rows 50000 --format csv
+"""
+import argparse
+import time
+import tracemalloc
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+import ingestion
+import pipeline
+
+
+def synthetic_sheet(n_rows, file_format, seed=42):
+    """Sheet of n_rows households as CSV or xlsx bytes."""
+    rng = np.random.default_rng(seed)
+
+    df = pd.DataFrame({
+        "Name": [f"Household {i}" for i in range(n_rows)],
+        "Address": [f"{number} {street} St" for number, street in zip(rng.integers(1, 9999, n_rows), rng.choice(["Main", "Oak", "Park", "Lake"], n_rows))],
+        "City": "Madison",
+        "State": "WI",
+        "Phone": [f"608-555-{i % 10000:04d}" for i in range(n_rows)],
+        "Notes": rng.choice(["", "Leave at door", "Call on arrival", "Dog in yard"], n_rows),
+        "Household Size": rng.integers(1, 8, n_rows),
+    })
+    df.loc[rng.random(n_rows) < 0.01, "City"] = None
+    df.loc[rng.random(n_rows) < 0.001, "Address"] = None
+
+    out = BytesIO()
+    if file_format == "csv":
+        df.to_csv(out, index=False)
+    else:
+        df.to_excel(out, index=False)
+
+    return out.getvalue()
+
+
+def previous_read(filename, contents):
+    """How uploads were read before the ingestion module."""
+    if filename.endswith(".csv"):
+        df = pd.read_csv(BytesIO(contents))
+    else:
+        df = pd.read_excel(BytesIO(contents))
+
+    df = df.dropna(axis=1, how="all").loc[:, (df != "").any()]
+    df = df.dropna(subset=["Address"])
+
+    return df, df["Address"] + " " + df["City"] + " " + df["State"]
+
+
+def ingestion_read(filename, contents):
+    df, row_errors = ingestion.read_spreadsheet(filename, contents)
+    return df, pipeline.spreadsheet_addresses(df)
+
+
+def measure(read, filename, contents):
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    df, addresses = read(filename, contents)
+
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "seconds": round(elapsed, 3),
+        "peak_mb": round(peak / 2**20, 1),
+        "rows": len(df),
+        "missing_addresses": int(addresses.isna().sum()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--format", choices=["csv", "xlsx"], default="csv")
+    args = parser.parse_args()
+
+    filename = f"households.{args.format}"
+    contents = synthetic_sheet(args.rows, args.format)
+    print({"rows": args.rows, "format": args.format, "file_mb": round(len(contents) / 2**20, 1),
+           "csv_engine": ingestion.CSV_ENGINE, "excel_engine": ingestion.EXCEL_ENGINE or "openpyxl"})
+
+    print({"reader": "previous", **measure(previous_read, filename, contents)})
+    print({"reader": "ingestion", **measure(ingestion_read, filename, contents)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Distance matrix fetching against the mock OSRM server.
+
+Builds the matrix for one large cluster with a single connection and with the
+configured concurrency, and checks that the tiled result matches the server's
+full answer.
+
+Run from the backend directory:
+    python -m benchmarks.bench_osrm --stops 450 --latency 0.05
+"""
+import argparse
+import time
+
+import numpy as np
+
+import osrm
+from benchmarks.mock_osrm_server import MockOSRMHandler, start_mock_server, synthetic_table
+
+
+def random_coordinates(n_stops, seed=42):
+    """(latitude, longitude) pairs spread around Madison, WI."""
+    rng = np.random.default_rng(seed)
+    return [(43.07 + rng.uniform(-0.15, 0.15), -89.40 + rng.uniform(-0.15, 0.15)) for _ in range(n_stops)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stops", type=int, default=450)
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated seconds per OSRM request")
+    parser.add_argument("--recordings", help="directory of recorded responses to replay")
+    args = parser.parse_args()
+
+    server, base_url = start_mock_server(recordings=args.recordings, latency=args.latency)
+    coordinates = random_coordinates(args.stops)
+
+    expected = np.array(synthetic_table(
+        [(lon, lat) for lat, lon in coordinates], list(range(args.stops)), list(range(args.stops))
+    )["distances"])
+
+    for concurrency in (1, osrm.OSRM_CONCURRENCY):
+        client = osrm.OSRMClient(base_url=base_url, concurrency=concurrency)
+        MockOSRMHandler.request_count = 0
+
+        start = time.perf_counter()
+        matrix = client.table(coordinates)
+        elapsed = time.perf_counter() - start
+
+        print({
+            "concurrency": concurrency,
+            "stops": args.stops,
+            "requests": MockOSRMHandler.request_count,
+            "seconds": round(elapsed, 3),
+            "matches_full_table": bool(np.allclose(matrix, expected, atol=0.2)),
+        })
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
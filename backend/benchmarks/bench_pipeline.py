@@ -0,0 +1,186 @@
+"""
+End-to-end pipeline benchmark with synthetic households and no live services.
+
+Generates a client list of --rows households (a --colocated fraction of them sharing an
+address with another one), geocodes it with the deterministic fake geocoder spread
+--spread degrees around Madison, WI, fetches road distances from the mock OSRM server
+and saves the grouping to a throwaway SQLite groupings table. All caches live in a
+temporary directory, so every run starts cold.
+
+Every stage (ingest, geocode, balanced_kmeans, colocate, matrix, route, persist) is
+timed and its peak traced memory (tracemalloc, API process only: route solves run in
+worker processes) recorded. Results are printed as JSON and written to --output, so
+runs on different commits can be compared.
+
+Run from the backend directory:
+    python -m benchmarks.bench_pipeline --rows 2000 --groups 8 --output bench_pipeline.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+import bpn_osm_and_kmeans
+import distance_cache
+import geocode_cache
+import geocoding
+import grouping_store
+import ingestion
+import osrm
+import pipeline
+from benchmarks.mock_osrm_server import MockOSRMHandler, start_mock_server
+
+STREETS = ["Main", "Oak", "Park", "Lake", "Johnson", "Gorham", "Regent", "Monroe", "Atwood", "Sherman"]
+
+
+def synthetic_sheet(n_rows, colocated=0.1, seed=42):
+    """CSV bytes of n_rows households; a `colocated` fraction repeat an earlier household's address."""
+    rng = np.random.default_rng(seed)
+
+    addresses = [f"{number} {street} St" for number, street in zip(rng.integers(1, 9999, n_rows), rng.choice(STREETS, n_rows))]
+    for i in np.flatnonzero(rng.random(n_rows) < colocated):
+        if i:
+            addresses[i] = addresses[rng.integers(0, i)]
+
+    df = pd.DataFrame({
+        "Name": [f"Household {i}" for i in range(n_rows)],
+        "Address": addresses,
+        "City": "Madison",
+        "State": "WI",
+        "Phone": [f"608-555-{i % 10000:04d}" for i in range(n_rows)],
+    })
+
+    out = BytesIO()
+    df.to_csv(out, index=False)
+    return out.getvalue()
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+class StageTimer:
+    """Wall time and peak traced memory of every stage, in the order they ran."""
+
+    def __init__(self):
+        self.stages = {}
+
+    def run(self, name, call, *args, **kwargs):
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+
+        result = call(*args, **kwargs)
+
+        self.stages[name] = {
+            "seconds": round(time.perf_counter() - start, 4),
+            "peak_mb": round(tracemalloc.get_traced_memory()[1] / 2**20, 2),
+        }
+        print(name, self.stages[name])
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--groups", type=int, default=8)
+    parser.add_argument("--spread", type=float, default=0.15, help="degrees around the center the households spread over")
+    parser.add_argument("--colocated", type=float, default=0.1, help="fraction of households at an earlier household's address")
+    parser.add_argument("--geocoder-latency", type=float, default=0.0, help="simulated seconds per geocoding request")
+    parser.add_argument("--osrm-latency", type=float, default=0.0, help="simulated seconds per OSRM request")
+    parser.add_argument("--time-budget", type=int, default=10, help="route solver deadline in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    args = parser.parse_args()
+
+    contents = synthetic_sheet(args.rows, args.colocated, args.seed)
+    server, base_url = start_mock_server(latency=args.osrm_latency)
+
+    with tempfile.TemporaryDirectory() as directory:
+        # fresh caches and database, pointed at the offline stand-ins
+        geocode_cache._cache = geocode_cache.GeocodeCache(f"{directory}/geocode_cache.db")
+        osrm._client = osrm.OSRMClient(base_url=base_url)
+        distance_cache._caches[osrm._client.profile] = distance_cache.DistanceCache(osrm._client.profile, f"{directory}/distance_cache")
+        groupings = grouping_store.SQLiteGroupings(f"{directory}/groupings.db")
+        provider = geocoding.FakeProvider(spread=args.spread, latency=args.geocoder_latency)
+
+        timer = StageTimer()
+        geocode_stats, colocation_stats, matrix_stats, route_stats = {}, {}, {}, {}
+
+        tracemalloc.start()
+        total_start = time.perf_counter()
+
+        df, row_errors = timer.run("ingest", ingestion.read_spreadsheet, "households.csv", contents)
+
+        geocoded_data = timer.run(
+            "geocode", bpn_osm_and_kmeans.geocode_addresses, pipeline.spreadsheet_addresses(df), provider, geocode_stats
+        )
+
+        stop_labels = timer.run("balanced_kmeans", bpn_osm_and_kmeans.get_groups, geocoded_data, args.groups)[0]
+
+        locations, location_of = timer.run(
+            "colocate", bpn_osm_and_kmeans.collapse_colocated, geocoded_data, labels=stop_labels, stats=colocation_stats
+        )
+        cluster_labels = np.zeros(len(locations), dtype=int)
+        cluster_labels[location_of] = stop_labels
+
+        # cold matrices from the mock server; the route stage then reads them from the distance cache
+        timer.run("matrix", bpn_osm_and_kmeans.distance_matrix, locations, args.groups, cluster_labels, matrix_stats, "osrm")
+
+        routes, _ = timer.run(
+            "route", bpn_osm_and_kmeans.generate_kmeans_grouping_graph,
+            locations, args.groups, cluster_labels, route_stats, "osrm", time_budget=args.time_budget,
+        )
+
+        groups = [[] for _ in range(args.groups)]
+        for entry, location in zip(geocoded_data, location_of):
+            groups[int(cluster_labels[location])].append({"Location": entry["full_result"]})
+
+        timer.run("persist", groupings.insert, [{
+            "filename": "households.csv",
+            "number_of_groups": args.groups,
+            "columns": list(df.columns),
+            "groups": groups,
+            "routes": routes,
+        }])
+
+        total_seconds = time.perf_counter() - total_start
+        tracemalloc.stop()
+
+    server.shutdown()
+
+    results = {
+        "benchmark": "pipeline",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "parameters": vars(args),
+        "stages": timer.stages,
+        "total_seconds": round(total_seconds, 4),
+        "stops": len(geocoded_data),
+        "row_errors": len(row_errors),
+        "geocode_stats": geocode_stats,
+        "colocation_stats": colocation_stats,
+        "osrm_requests": MockOSRMHandler.request_count,
+        "matrix_stats": matrix_stats,
+        "total_distance": route_stats["total_distance"],
+        "routing_wall_time": round(route_stats["wall_time"], 4),
+    }
+
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
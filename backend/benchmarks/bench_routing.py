@@ -0,0 +1,80 @@
+"""
+Routing solver throughput: Python distance callback vs. precomputed transit matrix.
+
+Solves the same random cluster with guided local search for a fixed time and reports
+solver branches and accepted neighbors per second for both ways of registering arc costs.
+
+Run from the backend directory:
+    python -m benchmarks.bench_routing --stops 100 --seconds 5
+"""
+import argparse
+import time
+
+import numpy as np
+from ortools.constraint_solver import pywrapcp
+from ortools.constraint_solver import routing_enums_pb2
+
+import bpn_osm_and_kmeans
+
+
+def random_cluster_matrix(n_stops, seed=42):
+    """Euclidean distances in meters between random points in a ~10 km square."""
+    rng = np.random.default_rng(seed)
+    points = rng.random((n_stops, 2)) * 10_000
+    return np.sqrt(((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=2)).tolist()
+
+
+def create_callback_model(cluster_distance_matrix):
+    """Model set up the way get_best_route used to: a Python closure evaluated for every arc."""
+    manager = pywrapcp.RoutingIndexManager(len(cluster_distance_matrix), 1, 0)
+    routing = pywrapcp.RoutingModel(manager)
+
+    def distance_callback(from_index, to_index):
+        from_node = manager.IndexToNode(from_index)
+        to_node = manager.IndexToNode(to_index)
+        return int(round(cluster_distance_matrix[from_node][to_node]))
+
+    transit_callback_index = routing.RegisterTransitCallback(distance_callback)
+    routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
+    routing.AddDimension(transit_callback_index, 0, 999999999, True, "Distance")
+    routing.GetDimensionOrDie("Distance").SetGlobalSpanCostCoefficient(100)
+
+    return manager, routing
+
+
+def run(routing, seconds):
+    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
+    search_parameters.first_solution_strategy = routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
+    search_parameters.local_search_metaheuristic = routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
+    search_parameters.time_limit.seconds = seconds
+
+    start = time.perf_counter()
+    solution = routing.SolveWithParameters(search_parameters)
+    elapsed = time.perf_counter() - start
+
+    solver = routing.solver()
+    return {
+        "objective": solution.ObjectiveValue() if solution else None,
+        "seconds": round(elapsed, 3),
+        "branches_per_second": round(solver.Branches() / elapsed),
+        "accepted_neighbors_per_second": round(solver.AcceptedNeighbors() / elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stops", type=int, default=100)
+    parser.add_argument("--seconds", type=int, default=5)
+    args = parser.parse_args()
+
+    cluster_distance_matrix = random_cluster_matrix(args.stops)
+
+    _, routing = create_callback_model(cluster_distance_matrix)
+    print("python callback: ", run(routing, args.seconds))
+
+    _, routing = bpn_osm_and_kmeans.create_routing_model(bpn_osm_and_kmeans.to_int_matrix(cluster_distance_matrix))
+    print("transit matrix:  ", run(routing, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Small-cluster fast paths (exact Held-Karp, local search next to a short OR-Tools solve) vs. OR-Tools.
+
+Solves the same random clusters both ways through solve_cluster_route and reports the
+mean solve time and how often the fast path's objective matches or beats OR-Tools.
+
+Run from the backend directory:
+    python -m benchmarks.bench_small_clusters --sizes 4 6 7 10 15 --clusters 20
+"""
+import argparse
+import time
+
+import numpy as np
+
+import bpn_osm_and_kmeans
+import small_tsp
+
+
+def random_cluster_matrix(n_stops, rng):
+    """Road-like distances in meters: Euclidean in a ~5 km square times a random detour factor."""
+    points = rng.random((n_stops, 2)) * 5_000
+    matrix = np.sqrt(((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=2))
+    return matrix * rng.uniform(1.0, 1.4, matrix.shape)
+
+
+def solve(matrix, fast_path):
+    limits = small_tsp.FAST_PATH_MAX_STOPS, small_tsp.LOCAL_SEARCH_MAX_STOPS
+    if not fast_path:
+        small_tsp.FAST_PATH_MAX_STOPS = small_tsp.LOCAL_SEARCH_MAX_STOPS = 0
+
+    try:
+        start = time.perf_counter()
+        result = bpn_osm_and_kmeans.solve_cluster_route(matrix, time.time() + 60)
+        return result["objective"], time.perf_counter() - start, result["solver"]
+    finally:
+        small_tsp.FAST_PATH_MAX_STOPS, small_tsp.LOCAL_SEARCH_MAX_STOPS = limits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 6, 7, 10, 15])
+    parser.add_argument("--clusters", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+
+    for n_stops in args.sizes:
+        fast_times, ortools_times, not_worse, better = [], [], 0, 0
+
+        for _ in range(args.clusters):
+            matrix = random_cluster_matrix(n_stops, rng)
+            fast_objective, fast_time, method = solve(matrix, True)
+            ortools_objective, ortools_time, _ = solve(matrix, False)
+
+            fast_times.append(fast_time)
+            ortools_times.append(ortools_time)
+            not_worse += fast_objective <= ortools_objective
+            better += fast_objective < ortools_objective
+
+        print({
+            "stops": n_stops,
+            "method": method,
+            "fast_path_ms": round(float(np.mean(fast_times)) * 1000, 2),
+            "ortools_ms": round(float(np.mean(ortools_times)) * 1000, 2),
+            "matches_or_beats": f"{not_worse}/{args.clusters}",
+            "beats": f"{better}/{args.clusters}",
+        })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Cluster-then-route (balanced k-means, one route per cluster) vs. one multi-vehicle VRP
+over all stops, cold and warm-started from the k-means groups.
+
+Uses the offline haversine distances, so no OSRM server is needed. Cluster routes are
+closed loops while VRP routes are open paths, so the cluster totals are also reported
+without each route's return leg.
+
+Run from the backend directory:
+    python -m benchmarks.bench_vrp --stops 200 --groups 5 --seconds 10
+"""
+import argparse
+import time
+
+import numpy as np
+
+import bpn_osm_and_kmeans
+
+
+def synthetic_locations(n_stops, seed=42):
+    """Random stops in a ~30 km square around Madison, WI."""
+    rng = np.random.default_rng(seed)
+    latitudes = 43.0731 + (rng.random(n_stops) - 0.5) * 0.3
+    longitudes = -89.4012 + (rng.random(n_stops) - 0.5) * 0.4
+
+    return [
+        {"latitude": latitude, "longitude": longitude, "full_result": f"Stop {i}"}
+        for i, (latitude, longitude) in enumerate(zip(latitudes, longitudes))
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stops", type=int, default=200)
+    parser.add_argument("--groups", type=int, default=5)
+    parser.add_argument("--seconds", type=int, default=10)
+    args = parser.parse_args()
+
+    locations = synthetic_locations(args.stops)
+
+    start = time.perf_counter()
+    labels = bpn_osm_and_kmeans.get_groups(locations, args.groups)[0]
+    stats = {}
+    routes, _ = bpn_osm_and_kmeans.generate_kmeans_grouping_graph(locations, args.groups, labels, stats, "haversine")
+    elapsed = time.perf_counter() - start
+
+    print({
+        "engine": "clusters",
+        "seconds": round(elapsed, 3),
+        "total_distance": stats["total_distance"],
+        "total_distance_without_return": sum(route["distance"] - route["leg_distances"][-1] for route in routes if route["solved"]),
+        "max_route_distance": max(route["distance"] for route in routes if route["solved"]),
+    })
+
+    for warm_start in (False, True):
+        start = time.perf_counter()
+        stats = {}
+        _, vehicle_routes = bpn_osm_and_kmeans.solve_vrp(
+            locations, args.groups, labels if warm_start else None, stats, "haversine", args.seconds
+        )
+        elapsed = time.perf_counter() - start
+
+        print({
+            "engine": "vrp (warm start)" if warm_start else "vrp",
+            "seconds": round(elapsed, 3),
+            "total_distance": stats["total_distance"],
+            "max_route_distance": max(route["max_route_distance"] for route in vehicle_routes.values()),
+            "warm_start_used": stats["warm_start"],
+        })
+
+
+if __name__ == "__main__":
+    main()
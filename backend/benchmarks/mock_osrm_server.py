@@ -0,0 +1,140 @@
+"""
+Mock OSRM table server for offline development and benchmarks.
+
+Replays recorded /table responses from a directory. Requests without a recording are
+answered with haversine distances scaled by a road circuity factor, so any coordinates
+work. With --record-from the server forwards unknown requests to a real OSRM server and
+saves the responses for later replay.
+
+Run from the backend directory:
+    python -m benchmarks.mock_osrm_server --port 5001 --recordings benchmarks/osrm_recordings
+    OSRM_BASE_URL=http://localhost:5001 uvicorn app:app --port 8000
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import requests
+
+EARTH_RADIUS_M = 6371000
+CIRCUITY_FACTOR = 1.3
+
+
+def recording_key(path, query):
+    """File name of the recording for a request; query parameters are sorted so their order does not matter."""
+    normalized = path + "?" + "&".join(sorted(query.split("&")))
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest() + ".json"
+
+
+def synthetic_table(coordinates, sources, destinations):
+    """OSRM-style table response with haversine distances times CIRCUITY_FACTOR."""
+    points = np.radians(np.array(coordinates, dtype=np.float64))  # (lon, lat)
+    src = points[sources]
+    dst = points[destinations]
+
+    dlat = dst[None, :, 1] - src[:, None, 1]
+    dlon = dst[None, :, 0] - src[:, None, 0]
+    a = np.sin(dlat / 2) ** 2 + np.cos(src[:, None, 1]) * np.cos(dst[None, :, 1]) * np.sin(dlon / 2) ** 2
+    distances = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a)) * CIRCUITY_FACTOR
+
+    return {"code": "Ok", "distances": np.round(distances, 1).tolist()}
+
+
+class MockOSRMHandler(BaseHTTPRequestHandler):
+    recordings = None
+    record_from = None
+    latency = 0.0
+    request_count = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+
+        if len(parts) != 4 or parts[0] != "table":
+            self.respond(400, {"code": "InvalidUrl", "message": "Only /table/v1/{profile}/{coordinates} is supported"})
+            return
+
+        with MockOSRMHandler.lock:
+            MockOSRMHandler.request_count += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        recording = os.path.join(self.recordings, recording_key(url.path, url.query)) if self.recordings else None
+
+        if recording and os.path.exists(recording):
+            with open(recording, "r") as f:
+                self.respond(200, json.load(f))
+            return
+
+        if self.record_from:
+            upstream = requests.get(self.record_from.rstrip("/") + self.path, timeout=60)
+            body = upstream.json()
+            if upstream.status_code == 200 and recording:
+                with open(recording, "w") as f:
+                    json.dump(body, f)
+            self.respond(upstream.status_code, body)
+            return
+
+        coordinates = [tuple(map(float, pair.split(","))) for pair in parts[3].split(";")]
+        query = parse_qs(url.query)
+        all_indices = list(range(len(coordinates)))
+        sources = [int(i) for i in query["sources"][0].split(";")] if "sources" in query else all_indices
+        destinations = [int(i) for i in query["destinations"][0].split(";")] if "destinations" in query else all_indices
+
+        self.respond(200, synthetic_table(coordinates, sources, destinations))
+
+    def respond(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock_server(port=0, recordings=None, record_from=None, latency=0.0):
+    """Start the mock server in a background thread. Returns (server, base_url)."""
+    if recordings:
+        os.makedirs(recordings, exist_ok=True)
+
+    handler = type("Handler", (MockOSRMHandler,), {
+        "recordings": recordings,
+        "record_from": record_from,
+        "latency": latency,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--recordings", help="directory of recorded responses to replay")
+    parser.add_argument("--record-from", help="real OSRM server to forward and record unknown requests to")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+
+    server, base_url = start_mock_server(args.port, args.recordings, args.record_from, args.latency)
+    print(f"Mock OSRM server listening on {base_url}")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
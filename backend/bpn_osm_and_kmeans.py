@@ -0,0 +1,1133 @@
+import time
+import pandas as pd
+from sklearn.cluster import KMeans
+import numpy as np
+import os
+import time
+from sklearn.cluster import DBSCAN
+from sklearn.neighbors import BallTree
+from collections import defaultdict
+from math import pi
+from scipy.spatial import distance_matrix
+import math
+from ortools.constraint_solver import routing_enums_pb2
+from ortools.constraint_solver import pywrapcp
+from ortools.graph.python import min_cost_flow
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import multiprocessing.util
+
+import address_normalization
+import distances
+import geocode_cache
+import geocoding
+import jobs
+import small_tsp
+
+# Clusters are solved in parallel; every solve ends by the shared deadline.
+# Routes are solved inside the job workers, so by default they split the CPUs between them.
+ROUTING_WORKERS = int(os.getenv("ROUTING_WORKERS", str(max(1, (os.cpu_count() or 1) // jobs.JOB_WORKERS))))
+CLUSTER_TIME_LIMIT_SECONDS = 30
+ROUTE_TIME_BUDGET_SECONDS = int(os.getenv("ROUTE_TIME_BUDGET_SECONDS", "60"))
+
+# Per-request solver settings (see routing_search_parameters); None values fall back to these.
+# A cluster's time limit is seconds_per_stop * stops, between min_seconds and max_seconds.
+DEFAULT_SOLVER_SETTINGS = {
+    "first_solution_strategy": "PATH_CHEAPEST_ARC",
+    "guided_local_search": False,
+    "seconds_per_stop": 0.2,
+    "min_seconds": 1,
+    "max_seconds": CLUSTER_TIME_LIMIT_SECONDS,
+    "stall_seconds": None,
+}
+FIRST_SOLUTION_STRATEGIES = [
+    name for name in routing_enums_pb2.FirstSolutionStrategy.Value.keys() if name not in ("UNSET", "EVALUATOR_STRATEGY")
+]
+
+# Largest integer cost in the balanced assignment; costs are squared degrees, so they are scaled up
+ASSIGNMENT_COST_SCALE = 1_000_000_000
+
+# Time-balanced grouping: per-stop loads in tenths of a minute, groups within 5% of the average
+LOAD_UNITS_PER_MINUTE = 10
+WEIGHT_BALANCE_TOLERANCE = 0.05
+TRAVEL_SPEED_KMH = 40
+METERS_PER_DEGREE = 111_320
+
+# Stops of a group closer than this (same building, same address) are routed as one location
+COLOCATION_RADIUS_M = float(os.getenv("COLOCATION_RADIUS_M", "25"))
+
+# Print every solved route as text (slow for big clusters, debugging only)
+ROUTE_DEBUG = os.getenv("ROUTE_DEBUG", "") == "1"
+
+# Weight of the longest route in the objective, to balance routes across vehicles
+GLOBAL_SPAN_COST_COEFFICIENT = 100
+
+# Arc cost used for pairs OSRM could not route
+UNREACHABLE_DISTANCE = 10_000_000
+_route_pool = None
+
+def geocode_addresses(address_list, provider=None, stats=None, progress=None):
+    """
+    Geocode a list of addresses with caching.
+    Success entries keep the same format; failures are also cached.
+
+    Addresses are looked up by their normalized form (see address_normalization), then by
+    near-duplicate spelling, and only the remaining ones are geocoded concurrently through
+    the configured provider (see geocoding.get_provider), each one only once.
+
+    If `stats` is a dict it is filled with hit/miss/fuzzy-hit counts for this call.
+    Every returned entry has the position of its address in address_list as "row".
+    progress(done, total) is called as network lookups complete (see geocoding.PROGRESS_EVERY).
+    """
+    cache = geocode_cache.get_cache()
+
+    # Several spellings of the same address share one key
+    keys = [address_normalization.normalize_address(address) for address in address_list]
+    first_address_for_key = {}
+    for address, key in zip(address_list, keys):
+        first_address_for_key.setdefault(key, address)
+
+    cached_entries = cache.get_many(first_address_for_key)
+    hits = len(cached_entries)
+    fuzzy_hits = 0
+
+    # 1. Look for a near-duplicate of every key that is not cached yet
+    missing_keys = [key for key in first_address_for_key if key not in cached_entries]
+
+    if geocode_cache.FUZZY_MATCH_ENABLED:
+        still_missing_keys = []
+
+        for key in missing_keys:
+            match = cache.find_similar(key)
+
+            if match:
+                matched_key, entry, score = match
+                cached_entries[key] = entry
+                fuzzy_hits += 1
+                print(f"[CACHE-FUZZY] {key} ~ {matched_key} ({score:.2f})")
+            else:
+                still_missing_keys.append(key)
+
+        missing_keys = still_missing_keys
+
+    # 2. Geocode every key that is still missing
+    if missing_keys:
+        engine = geocoding.GeocodingEngine(provider or geocoding.get_provider())
+        key_for_address = {first_address_for_key[key]: key for key in missing_keys}
+
+        def save(results):
+            # Save to cache batch by batch (success or failure); service errors are left out so they get retried
+            new_entries = {key_for_address[address]: entry for address, entry in results.items() if entry is not None}
+            cache.put_many(new_entries)
+            cached_entries.update(new_entries)
+
+        engine.geocode_many(list(key_for_address), progress, save)
+
+    if stats is not None:
+        unique = len(first_address_for_key)
+        stats.update({
+            "addresses": len(address_list),
+            "unique_addresses": unique,
+            "hits": hits,
+            "fuzzy_hits": fuzzy_hits,
+            "misses": len(missing_keys),
+            "hit_rate": (hits + fuzzy_hits) / unique if unique else 0.0,
+            "miss_rate": len(missing_keys) / unique if unique else 0.0,
+        })
+
+    # 3. Build the results in the original order
+    geocoded_locations = []
+
+    for row, (address, key) in enumerate(zip(address_list, keys)):
+        if key not in cached_entries:
+            continue
+
+        entry = cached_entries[key]
+
+        # If previous attempt failed
+        if entry.get("error"):
+            print(f"[CACHE-FAIL] {address} previously failed to geocode")
+        else:
+            geocoded_locations.append({**entry, "address": address, "row": row})
+
+    return geocoded_locations
+
+def get_groups(data, n_clusters, weights=None, stats=None):
+    """
+    Group the geocoded locations.
+
+    Without weights every group gets the same number of stops (balanced_kmeans).
+    With weights (service minutes per stop) the groups balance service plus estimated
+    travel minutes instead (weighted_kmeans).
+    If `stats` is a dict it is filled with how even the groups came out (see group_balance).
+    """
+    x = np.array([[i["latitude"], i["longitude"]] for i in data])
+
+    if weights is None:
+        cluster_labels, cluster_centers = balanced_kmeans(x, n_clusters)
+        loads = np.ones(len(x))
+        metric = "stops"
+    else:
+        cluster_labels, cluster_centers, loads = weighted_kmeans(x, n_clusters, weights)
+        metric = "minutes"
+
+    # print("Cluster Labels: ", cluster_labels)
+
+    if stats is not None:
+        stats.update(group_balance(cluster_labels, loads, n_clusters, metric))
+
+    return (cluster_labels, cluster_centers, x)
+
+# def get_groups(data, n_clusters):
+#   """
+#     Creates the clusters of locations
+
+#     Args:
+#         address_list (<class 'pandas.core.series.Series'>): one-dimensional labeled array of location names
+
+#     Returns:
+#         list: List of dictionaries which contain information of the latitude and longitutde of each location
+#     """
+
+#   x = []
+#   for i in data:
+#     x.append([i.get("latitude"),i.get("longitude")])
+#   x= np.array(x)
+
+
+#   # idk what random_state does but keep it for now
+#   kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+#   kmeans.fit(x)
+
+
+#   cluster_labels = kmeans.labels_
+#   cluster_centers = kmeans.cluster_centers_
+
+#   return (cluster_labels, cluster_centers, x)
+
+def generate_kmeans_grouping_graph(geocode_address_data, n_clusters, cluster_labels, route_stats=None, distance_backend=None, initial_routes=None, time_budget=None, solver_settings=None):
+  """
+  Solve the routes of the groups.
+  initial_routes, time_budget and solver_settings are passed on to get_best_route.
+
+  Returns (routes, map_data): the routes of every group as JSON (see serialize_routes)
+  and the points, group labels and route polylines for rendering.render_map.
+  Nothing is drawn here, so this is safe to call on the request path.
+  """
+
+  labels = [int(cluster) for cluster in cluster_labels]
+
+  # Calling distance_matrix temporarily
+#   distance_matrix(geocode_address_data, n_clusters, cluster_labels)
+  # getting the best routes
+  cluster_routes = get_best_route(geocode_address_data, n_clusters, cluster_labels, route_stats, distance_backend, initial_routes, time_budget, solver_settings)
+
+  # the locations of every group, in the same order as the rows of its distance matrix
+  cluster_locations = defaultdict(list)
+  for location, cluster in zip(geocode_address_data, labels):
+    cluster_locations[cluster].append(location)
+
+  routes = serialize_routes(cluster_routes, cluster_locations)
+
+  return routes, route_map_data(geocode_address_data, labels, routes)
+
+
+def route_map_data(geocode_address_data, labels, routes):
+  """Points, group labels and route polylines for rendering.render_map, one point per stop."""
+  points = []
+  point_labels = []
+  for location, label in zip(geocode_address_data, labels):
+    for member in location_members(location):
+      points.append([member["latitude"], member["longitude"]])
+      point_labels.append(label)
+
+  return {"points": points, "labels": point_labels, "routes": route_polylines(routes)}
+
+
+def saved_route_map_data(routes):
+  """
+  route_map_data of a saved grouping, from its serialized routes alone (saved groups
+  have no coordinates). Stops of groups whose route was not solved are not drawn.
+  """
+  points = []
+  point_labels = []
+  for route in routes:
+    for stop in route["stops"]:
+      points.append([stop["latitude"], stop["longitude"]])
+      point_labels.append(int(route["group"]))
+
+  return {"points": points, "labels": point_labels, "routes": route_polylines(routes)}
+
+
+def route_polylines(routes):
+  """Every solved route's stops as [latitude, longitude], by group."""
+  map_routes = {}
+  for route in routes:
+    if route["solved"]:
+      # closed routes are drawn back to their first stop
+      stops = route["stops"] + route["stops"][:1] if route["closed"] else route["stops"]
+      map_routes[str(route["group"])] = [[stop["latitude"], stop["longitude"]] for stop in stops]
+
+  return map_routes
+
+
+def generate_vrp_grouping(geocode_address_data, n_vehicles, initial_labels=None, route_stats=None, distance_backend=None, solver_settings=None):
+  """
+  Group and route in one step with solve_vrp: every vehicle's route is a group.
+
+  Returns (cluster_labels, routes, map_data) like generate_kmeans_grouping_graph, plus
+  the group of every location. initial_labels (e.g. the k-means groups) warm-start the search.
+  """
+  cluster_labels, vehicle_routes = solve_vrp(geocode_address_data, n_vehicles, initial_labels, route_stats, distance_backend, solver_settings=solver_settings)
+  labels = [int(vehicle) for vehicle in cluster_labels]
+
+  # VRP routes index into all of the locations
+  vehicle_locations = {vehicle: geocode_address_data for vehicle in vehicle_routes}
+  routes = serialize_routes(vehicle_routes, vehicle_locations)
+
+  return cluster_labels, routes, route_map_data(geocode_address_data, labels, routes)
+
+
+def balanced_assignment(cost, sizes, demands=None, min_sizes=None):
+    """
+    Assign every point to a cluster so that cluster c gets at most sizes[c] (and at
+    least min_sizes[c]) units of demand, one unit per point by default, and the total
+    cost is minimal.
+
+    Solved as a min-cost flow over N x K point -> cluster arcs instead of a Hungarian
+    assignment over an expanded N x N matrix, so memory is O(N*K) rather than O(N^2).
+    With demands a point's flow can be split between clusters; it goes to the cluster
+    that received most of it.
+    """
+    N, n_clusters = cost.shape
+    demands = np.ones(N, dtype=np.int64) if demands is None else np.asarray(demands, dtype=np.int64)
+    sizes = np.asarray(sizes, dtype=np.int64)
+    min_sizes = np.zeros(n_clusters, dtype=np.int64) if min_sizes is None else np.asarray(min_sizes, dtype=np.int64)
+
+    # Min-cost flow needs integer costs; scale so the largest cost is ASSIGNMENT_COST_SCALE
+    max_cost = cost.max()
+    scale = ASSIGNMENT_COST_SCALE / max_cost if max_cost > 0 else 0.0
+    int_cost = np.rint(cost * scale).astype(np.int64)
+
+    # nodes: points 0..N-1, clusters N..N+K-1, sink N+K
+    # A cluster's minimum is taken as its own demand, so only the rest flows on to the sink
+    sink = N + n_clusters
+    point_nodes = np.repeat(np.arange(N), n_clusters)
+    cluster_nodes = np.tile(np.arange(N, N + n_clusters), N)
+
+    smcf = min_cost_flow.SimpleMinCostFlow()
+    assignment_arcs = smcf.add_arcs_with_capacity_and_unit_cost(
+        point_nodes, cluster_nodes, np.repeat(demands, n_clusters), int_cost.ravel()
+    )
+    smcf.add_arcs_with_capacity_and_unit_cost(
+        np.arange(N, N + n_clusters), np.full(n_clusters, sink), sizes - min_sizes, np.zeros(n_clusters, dtype=np.int64)
+    )
+    smcf.set_nodes_supplies(
+        np.arange(N + n_clusters + 1), np.concatenate([demands, -min_sizes, [min_sizes.sum() - demands.sum()]])
+    )
+
+    status = smcf.solve()
+    if status != smcf.OPTIMAL:
+        raise Exception(f"Balanced assignment failed with status {status}")
+
+    flows = smcf.flows(assignment_arcs).reshape(N, n_clusters)
+    return flows.argmax(axis=1)
+
+
+def kmeans_cost_matrix(x, n_clusters, random_state=42):
+    """
+    Initial KMeans centroids and the cost matrix (squared distance of each point to
+    each center) shared by balanced_kmeans and weighted_kmeans.
+    """
+    N = len(x)
+
+    kmeans = KMeans(n_clusters=n_clusters, random_state=random_state, n_init=10)
+    kmeans.fit(x)
+    centers = kmeans.cluster_centers_
+
+    cost = np.zeros((N, n_clusters))
+    for c in range(n_clusters):
+        diff = x - centers[c]
+        cost[:, c] = np.sum(diff * diff, axis=1)
+
+    return centers, cost
+
+
+def cluster_centers_of(x, cluster_labels, centers):
+    """Mean of every cluster's points (the old center if a cluster ended up empty)."""
+    new_centers = np.zeros_like(centers)
+    for c in range(len(centers)):
+        pts = x[cluster_labels == c]
+        new_centers[c] = pts.mean(axis=0) if len(pts) else centers[c]
+
+    return new_centers
+
+
+def balanced_kmeans(x, n_clusters, random_state=42):
+    """
+    Balanced K-Means implemented via a min-cost flow assignment.
+    Ensures cluster sizes differ by at most 1.
+    """
+
+    N = len(x)
+
+    # Step 1 and 2: initial KMeans centroids and cost matrix
+    centers, cost = kmeans_cost_matrix(x, n_clusters, random_state)
+
+    # Step 3: balanced assignment target sizes
+    base = N // n_clusters
+    extra = N % n_clusters
+    sizes = [base + (1 if i < extra else 0) for i in range(n_clusters)]
+
+    # Step 4: solve the size-constrained assignment
+    cluster_labels = balanced_assignment(cost, sizes)
+
+    # recompute cluster centers
+    new_centers = cluster_centers_of(x, cluster_labels, centers)
+
+    return cluster_labels, new_centers
+
+
+def estimated_travel_minutes(cost):
+    """
+    Rough travel minutes each stop adds to a route: the distance to its nearest center,
+    from the k-means cost matrix (squared degrees), at TRAVEL_SPEED_KMH on roads.
+    """
+    meters = np.sqrt(cost.min(axis=1)) * METERS_PER_DEGREE * distances.CIRCUITY_FACTOR
+    return meters / (TRAVEL_SPEED_KMH * 1000 / 60)
+
+
+def weighted_kmeans(x, n_clusters, weights, random_state=42):
+    """
+    K-Means that balances driver time instead of the number of stops.
+
+    Every stop's load is its weight (service minutes) plus its estimated travel minutes,
+    and the min-cost flow assignment caps every cluster at the average load plus
+    WEIGHT_BALANCE_TOLERANCE (and floors it at the average minus the tolerance). Returns the labels, centers and per-stop loads.
+    """
+    centers, cost = kmeans_cost_matrix(x, n_clusters, random_state)
+
+    loads = np.asarray(weights, dtype=np.float64) + estimated_travel_minutes(cost)
+
+    # integer demand units for the flow, at least one per stop
+    demands = np.maximum(np.rint(loads * LOAD_UNITS_PER_MINUTE), 1).astype(np.int64)
+    average = demands.sum() / n_clusters
+    capacity = int(math.ceil(average * (1 + WEIGHT_BALANCE_TOLERANCE)))
+    minimum = int(average * (1 - WEIGHT_BALANCE_TOLERANCE))
+
+    cluster_labels = balanced_assignment(cost, [capacity] * n_clusters, demands, [minimum] * n_clusters)
+    new_centers = cluster_centers_of(x, cluster_labels, centers)
+
+    return cluster_labels, new_centers, loads
+
+
+def group_balance(cluster_labels, loads, n_clusters, metric, counts=None):
+    """
+    How even the groups are on `metric` ("stops" or "minutes"): the load and stop count
+    of every group (counts[i] stops for location i, one by default), and the largest
+    group relative to the average.
+    """
+    group_loads = np.bincount(cluster_labels, weights=loads, minlength=n_clusters)
+    mean = group_loads.mean()
+
+    return {
+        "metric": metric,
+        "group_loads": [round(float(load), 1) for load in group_loads],
+        "group_stops": np.bincount(cluster_labels, weights=counts, minlength=n_clusters).astype(int).tolist(),
+        "max_over_mean": round(float(group_loads.max() / mean), 3) if mean else 0.0,
+        "coefficient_of_variation": round(float(group_loads.std() / mean), 3) if mean else 0.0,
+    }
+
+def collapse_colocated(geocode_address_data, radius=COLOCATION_RADIUS_M, labels=None, stats=None):
+    """
+    Merge stops within `radius` meters of each other into one location.
+
+    A ball tree (haversine metric) finds every stop's neighbours; each stop not merged
+    yet starts a location and takes its unmerged neighbours along, so every location
+    spans at most `radius` around its first stop and has that stop's coordinates.
+    Every location is a copy of its first stop's entry with the merged entries, in
+    input order, under "members". A radius of 0 or less merges nothing.
+
+    With labels (the group of every stop) only stops of the same group are merged, so
+    a location never holds more stops than its group and grouping stays balanced.
+
+    Returns (locations, location_of) where location_of[i] is the location of stop i.
+    If `stats` is a dict it gets the number of stops and locations and how much
+    smaller the distance matrices get.
+    """
+    N = len(geocode_address_data)
+    location_of = np.full(N, -1)
+    locations = []
+
+    if N and radius > 0:
+        x = np.radians([[entry["latitude"], entry["longitude"]] for entry in geocode_address_data])
+        neighbours = BallTree(x, metric="haversine").query_radius(x, r=radius / distances.EARTH_RADIUS_M)
+    else:
+        neighbours = [[i] for i in range(N)]
+
+    for i in range(N):
+        if location_of[i] >= 0:
+            continue
+
+        members = np.sort([
+            j for j in neighbours[i] if location_of[j] < 0 and (labels is None or labels[j] == labels[i])
+        ])
+        location_of[members] = len(locations)
+        locations.append({**geocode_address_data[i], "members": [geocode_address_data[j] for j in members]})
+
+    if stats is not None:
+        stats.update({
+            "radius": radius,
+            "stops": N,
+            "locations": len(locations),
+            "matrix_entries": N * N,
+            "collapsed_matrix_entries": len(locations) ** 2,
+            "matrix_reduction": round(1 - len(locations) ** 2 / (N * N), 3) if N else 0.0,
+        })
+
+    return locations, location_of
+
+
+def location_members(location):
+    """The stops a (possibly collapsed) location stands for."""
+    return location.get("members") or [location]
+
+
+def dbscan(data, minpts):
+    x = []
+    radians = pi/180
+    for i in data:
+        x.append([i.get("latitude") * radians,i.get("longitude") * radians])
+    x= np.array(x)
+
+    epsilon = 200/6371000
+
+    db = DBSCAN(eps=epsilon, min_samples=minpts, metric="haversine").fit(x)
+    core_samples_mask = np.zeros_like(db.labels_, dtype=bool)
+    core_samples_mask[db.core_sample_indices_] = True
+    labels = db.labels_
+
+    clusters = defaultdict(list)
+
+    for point, label in zip(x, labels):
+        if label != -1:
+            clusters[label].append(point)
+
+    clusters = dict(clusters)
+
+    clusters_deg = {}
+
+    for k, points in clusters.items():
+        clusters_deg[int(k)] = [
+            [
+                np.degrees(p[0]),
+                np.degrees(p[1])
+            ]
+        for p in points
+        ]
+
+    return clusters_deg
+
+
+def distance_matrix(geocode_address_data, n_clusters, cluster_labels, stats=None, backend=None):
+    """
+    Distance matrix (meters, NumPy array) of every cluster, plus the clusters' coordinates.
+    backend is "osrm", "haversine" or "hybrid" (see distances.cluster_matrices).
+    If `stats` is a dict it is filled with OSRM request and cache hit counts.
+    """
+
+    #Creating a cluster dictionary
+    cluster_dict = {}
+
+    for i in range(len(geocode_address_data)):
+        coordinates = {}
+
+        coordinates["latitude"] = geocode_address_data[i].get("latitude")
+        coordinates["longitude"] = geocode_address_data[i].get("longitude")
+
+        cluster_number = int(cluster_labels[i])
+        if cluster_number not in cluster_dict:
+            cluster_dict[cluster_number] = []
+
+        cluster_dict[cluster_number].append(coordinates)
+    
+    # print("cluster_dict: ", cluster_dict)
+
+    clusters = list(cluster_dict)
+    cluster_coordinates = [[(i["latitude"], i["longitude"]) for i in cluster_dict[cluster]] for cluster in clusters]
+
+    matrices = distances.cluster_matrices(cluster_coordinates, backend, stats)
+    distance_matrices = dict(zip(clusters, matrices))
+
+    print("distance matrices: ", distance_matrices)
+    return(distance_matrices, cluster_dict)
+
+def extract_routes(manager, routing, solution, int_matrix, dummy_depot=False):
+    """
+    Structured routes of a solution: for every used vehicle the node indices in
+    visiting order (ending back at the depot) as an int32 array, the distance of every
+    leg, the cumulative distance on arrival at every node and the route distance.
+
+    With dummy_depot node 0 is a zero-distance depot: it is left out, indices are
+    shifted to the stops (node - 1) and the routes are open paths.
+    Returns (routes, max_route_distance).
+    """
+    routes = []
+    stop_matrix = int_matrix[1:, 1:] if dummy_depot else int_matrix
+
+    max_route_distance = 0
+    for vehicle_id in range(routing.vehicles()):
+        if not routing.IsVehicleUsed(solution, vehicle_id):
+            continue
+
+        nodes = []
+        index = routing.Start(vehicle_id)
+        while not routing.IsEnd(index):
+            nodes.append(manager.IndexToNode(index))
+            index = solution.Value(routing.NextVar(index))
+        nodes.append(manager.IndexToNode(index))
+
+        indices = np.array(nodes, dtype=np.int32)
+        if dummy_depot:
+            indices = indices[1:-1] - 1
+
+        route = structured_route(vehicle_id, indices, stop_matrix, closed=not dummy_depot)
+        routes.append(route)
+
+        max_route_distance = max(route["route_distance"], max_route_distance)
+
+    return routes, max_route_distance
+
+def structured_route(vehicle_id, indices, int_matrix, closed=True):
+    """Route dict (see extract_routes) for node indices in visiting order."""
+    indices = np.asarray(indices, dtype=np.int32)
+
+    # arc costs are the registered matrix, so the legs are one fancy-indexing lookup
+    leg_distances = int_matrix[indices[:-1], indices[1:]]
+    cumulative_distances = np.concatenate([[0], np.cumsum(leg_distances)])
+
+    return {
+        "vehicle": vehicle_id,
+        "indices": indices,
+        "leg_distances": leg_distances,
+        "cumulative_distances": cumulative_distances,
+        "route_distance": int(cumulative_distances[-1]),
+        "closed": closed,
+    }
+
+def print_solution(routes, objective):
+    """Prints solution on console. Debug view only (ROUTE_DEBUG), not used to build results."""
+    print(f"Objective: {objective}")
+
+    for route in routes:
+        plan_output = f"Route for vehicle {route['vehicle']}:\n"
+        plan_output += " -> ".join(str(node) for node in route["indices"]) + "\n"
+        plan_output += f"Distance of the route: {route['route_distance']}m\n"
+        print(plan_output)
+
+def serialize_routes(cluster_routes, cluster_locations):
+    """
+    JSON-ready routes of every group from the structured solver results.
+
+    Every group has its stops in visiting order, leg_distances[i] from stops[i] to the
+    next stop, cumulative_distances[i] driven before reaching stops[i], the route
+    distance in meters and the objective. Closed routes (one cluster per route) return
+    to the first stop, so their last leg goes back there; open routes (solve_vrp) do not.
+    cluster_locations holds each group's geocoded locations in distance matrix order.
+    A collapsed location (see collapse_colocated) becomes its stops, one after the
+    other with 0 m legs between them.
+    """
+    routes = []
+
+    for cluster, cluster_data in cluster_routes.items():
+        # single vehicle per cluster, so the first route is the cluster's route
+        if not cluster_data["routes"]:
+            routes.append({"group": cluster, "solved": False, "closed": True, "stops": [], "distance": None, "objective": None})
+            continue
+
+        route = cluster_data["routes"][0]
+        locations = cluster_locations[cluster]
+
+        # the last index of a closed route is the return to the depot
+        stop_indices = route["indices"][:-1] if route["closed"] else route["indices"]
+
+        stops, leg_distances, cumulative_distances = [], [], []
+        for position, i in enumerate(stop_indices.tolist()):
+            members = location_members(locations[i])
+
+            for member in members:
+                stops.append({
+                    "Location": member["full_result"],
+                    "latitude": member["latitude"],
+                    "longitude": member["longitude"],
+                })
+                cumulative_distances.append(int(route["cumulative_distances"][position]))
+
+            leg_distances.extend([0] * (len(members) - 1))
+            if position < len(route["leg_distances"]):
+                leg_distances.append(int(route["leg_distances"][position]))
+
+        routes.append({
+            "group": cluster,
+            "solved": True,
+            "closed": route["closed"],
+            "stops": stops,
+            "leg_distances": leg_distances,
+            "cumulative_distances": cumulative_distances,
+            "distance": route["route_distance"],
+            "objective": cluster_data["objective"],
+        })
+
+    return routes
+
+
+def to_int_matrix(cluster_distance_matrix):
+    """
+    Contiguous int64 copy of a distance matrix in meters, as OR-Tools needs integer costs.
+    Missing distances (OSRM returns null for unroutable pairs) become UNREACHABLE_DISTANCE.
+    """
+    matrix = np.array(cluster_distance_matrix, dtype=np.float64)
+    matrix[~np.isfinite(matrix)] = UNREACHABLE_DISTANCE
+    return np.ascontiguousarray(np.rint(matrix), dtype=np.int64)
+
+
+def create_routing_model(int_matrix, num_vehicles=1, depot=0):
+    """
+    Routing index manager and model for an integer distance matrix, with arc costs
+    and the "Distance" dimension set up.
+
+    The matrix is registered with RegisterTransitMatrix so the solver reads arc costs
+    in C++ instead of calling back into Python for every arc it evaluates.
+    """
+    # creating a routing index manager
+    manager = pywrapcp.RoutingIndexManager(len(int_matrix), num_vehicles, depot)
+
+    # create routing model
+    routing = pywrapcp.RoutingModel(manager)
+
+    # register the distances between nodes
+    transit_callback_index = routing.RegisterTransitMatrix(int_matrix.tolist())
+
+    # defining cost of each arc
+    routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
+
+    # Add Distance Constraint 
+    dimension_name = "Distance"
+    routing.AddDimension(
+        transit_callback_index,
+        0, # no slack
+        999999999, # vehicle maximum travel distance (setting it high temporarily)
+        True, # start cumul to zero
+        dimension_name
+    )
+    distance_dimension = routing.GetDimensionOrDie(dimension_name)
+    distance_dimension.SetGlobalSpanCostCoefficient(GLOBAL_SPAN_COST_COEFFICIENT)
+
+    return manager, routing
+
+
+def cheapest_insertion(route, int_matrix):
+    """
+    Closed route (starting at the depot) extended with every node of int_matrix that
+    is not on it yet, each inserted where it adds the least distance.
+    """
+    route = list(route)
+    missing = np.setdiff1d(np.arange(len(int_matrix)), route)
+
+    for node in missing:
+        current = np.array(route)
+        following = np.roll(current, -1)
+        added = int_matrix[current, node] + int_matrix[node, following] - int_matrix[current, following]
+        route.insert(int(np.argmin(added)) + 1, int(node))
+
+    return route
+
+
+def solver_settings_with_defaults(settings=None):
+    """Solver settings with DEFAULT_SOLVER_SETTINGS filled in for missing or None values."""
+    settings = {key: value for key, value in (settings or {}).items() if value is not None}
+    return {**DEFAULT_SOLVER_SETTINGS, **settings}
+
+
+def solver_time_limit(settings, n_stops, seconds_left):
+    """Time limit for n_stops stops: seconds_per_stop each, clamped to min_seconds/max_seconds and seconds_left."""
+    time_limit = settings["seconds_per_stop"] * n_stops
+    time_limit = min(max(time_limit, settings["min_seconds"]), settings["max_seconds"], seconds_left)
+    return max(time_limit, 0.1)
+
+
+def routing_search_parameters(settings, time_limit):
+    """OR-Tools search parameters for solver settings and a time limit in seconds."""
+    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
+    search_parameters.first_solution_strategy = (
+        getattr(routing_enums_pb2.FirstSolutionStrategy, settings["first_solution_strategy"])
+    )
+
+    # Without a metaheuristic the search stops at the first local optimum
+    if settings["guided_local_search"]:
+        search_parameters.local_search_metaheuristic = (
+            routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
+        )
+
+    search_parameters.time_limit.FromMilliseconds(int(time_limit * 1000))
+    return search_parameters
+
+
+class ObjectiveTrace:
+    """
+    At-solution callback recording (seconds since start, objective) every time the
+    objective improves, and ending the search once stall_seconds pass without improvement.
+    """
+
+    def __init__(self, routing, stall_seconds=None):
+        self.routing = routing
+        self.stall_seconds = stall_seconds
+        self.start = time.time()
+        self.last_improvement = self.start
+        self.best = None
+        self.trace = []
+
+    def __call__(self):
+        objective = self.routing.CostVar().Value()
+        now = time.time()
+
+        if self.best is None or objective < self.best:
+            self.best = objective
+            self.last_improvement = now
+            self.trace.append([round(now - self.start, 3), objective])
+        elif self.stall_seconds and now - self.last_improvement > self.stall_seconds:
+            self.routing.solver().FinishCurrentSearch()
+
+
+def solve_small_cluster_route(int_matrix, solve_start):
+    """
+    solve_cluster_route for clusters of at most small_tsp.FAST_PATH_MAX_STOPS stops.
+    The route is optimal, so an initial route is not needed. The objective is computed
+    the way the OR-Tools model would (arc costs plus the span cost of the single route),
+    so results of both paths compare directly.
+    """
+    indices, method = small_tsp.solve_small_tsp(int_matrix)
+    route = structured_route(0, indices, int_matrix)
+    objective = route["route_distance"] * (1 + GLOBAL_SPAN_COST_COEFFICIENT)
+
+    if ROUTE_DEBUG:
+        print_solution([route], objective)
+
+    solve_time = time.time() - solve_start
+
+    return {
+        "routes": [route],
+        "objective": objective,
+        "max_route_distance": route["route_distance"],
+        "warm_start": False,
+        "time_limit": solve_time,
+        "objective_trace": [[round(solve_time, 3), objective]],
+        "solve_time": solve_time,
+        "solver": method,
+        "solver_stats": {},
+    }
+
+
+def solve_cluster_route(cluster_distance_matrix, deadline, initial_route=None, settings=None):
+    """
+    Solve the route for one cluster with OR-Tools.
+    Runs in a worker process; the time limit scales with the number of stops (see
+    DEFAULT_SOLVER_SETTINGS) and never goes past `deadline` (a time.time() value).
+    settings are the solver settings of the request (see solver_settings_with_defaults).
+
+    initial_route (node indices starting at the depot, e.g. a previous route) seeds the
+    search through ReadAssignmentFromRoutes; nodes missing from it are added by cheapest
+    insertion first.
+
+    Clusters of up to small_tsp.FAST_PATH_MAX_STOPS stops are solved exactly without
+    OR-Tools. Up to small_tsp.LOCAL_SEARCH_MAX_STOPS stops OR-Tools runs for at most
+    min_seconds and its route is compared with a 2-opt/Or-opt route (see
+    small_tsp.solve_small_tsp); the shorter one is kept.
+    """
+    solve_start = time.time()
+    settings = solver_settings_with_defaults(settings)
+
+    time_limit = solver_time_limit(settings, len(cluster_distance_matrix), deadline - solve_start)
+
+    cluster_data = {}
+
+    # creating the dictionary to pass to OR-tools
+
+    data = {}
+    data["distance_matrix"] = cluster_distance_matrix
+    data["num_vehicles"] = 1 # change num_vehicles to how many ever needed
+    data["depot"] = 0 # index for the starting location
+
+    int_matrix = to_int_matrix(data["distance_matrix"])
+
+    # Tiny clusters are solved exactly, without OR-Tools
+    if len(int_matrix) <= small_tsp.FAST_PATH_MAX_STOPS:
+        return solve_small_cluster_route(int_matrix, solve_start)
+
+    # Small clusters: a 2-opt/Or-opt route and a short OR-Tools solve, the better one is kept
+    local_search_route = None
+    if len(int_matrix) <= small_tsp.LOCAL_SEARCH_MAX_STOPS:
+        start_route = None if initial_route is None else cheapest_insertion(initial_route, int_matrix) + [0]
+        local_search_route, _ = small_tsp.solve_small_tsp(int_matrix, start_route)
+        time_limit = min(time_limit, settings["min_seconds"])
+
+    manager, routing = create_routing_model(int_matrix, data["num_vehicles"], data["depot"])
+
+    # Setting first solution heuristic, metaheuristic and time limit
+    search_parameters = routing_search_parameters(settings, time_limit)
+
+    objective_trace = ObjectiveTrace(routing, settings["stall_seconds"])
+    routing.AddAtSolutionCallback(objective_trace)
+
+    initial_solution = None
+    if initial_route is not None and len(int_matrix) > 1:
+        routing.CloseModelWithParameters(search_parameters)
+        route = cheapest_insertion(initial_route, int_matrix)
+        initial_solution = routing.ReadAssignmentFromRoutes([route[1:]], True)
+
+    # Solve the problem
+    if initial_solution is not None:
+        solution = routing.SolveFromAssignmentWithParameters(initial_solution, search_parameters)
+    else:
+        solution = routing.SolveWithParameters(search_parameters)
+    solver = routing.solver()
+
+    # saving the solution if it exists in the dictionary
+    if solution:
+        routes, max_route_distance = extract_routes(manager, routing, solution, int_matrix)
+        cluster_data["routes"] = routes
+        cluster_data["objective"] = solution.ObjectiveValue()
+        cluster_data["max_route_distance"] = max_route_distance
+
+        if ROUTE_DEBUG:
+            print_solution(routes, cluster_data["objective"])
+    else:
+        cluster_data["routes"] = []
+        cluster_data["objective"] = None
+        cluster_data["max_route_distance"] = None
+
+    cluster_data["solver"] = "or-tools"
+
+    # keep the local search route if OR-Tools did not improve on it
+    if local_search_route is not None:
+        route = structured_route(0, local_search_route, int_matrix)
+        objective = route["route_distance"] * (1 + GLOBAL_SPAN_COST_COEFFICIENT)
+
+        if cluster_data["objective"] is None or objective < cluster_data["objective"]:
+            cluster_data["routes"] = [route]
+            cluster_data["objective"] = objective
+            cluster_data["max_route_distance"] = route["route_distance"]
+            cluster_data["solver"] = "local_search"
+
+    cluster_data["warm_start"] = initial_solution is not None
+    cluster_data["time_limit"] = time_limit
+    cluster_data["objective_trace"] = objective_trace.trace
+    cluster_data["solve_time"] = time.time() - solve_start
+    cluster_data["solver_stats"] = {
+        "branches": solver.Branches(),
+        "accepted_neighbors": solver.AcceptedNeighbors(),
+        "solutions": solver.Solutions(),
+    }
+
+    return cluster_data
+
+
+def get_route_pool():
+    """
+    Process pool shared by every get_best_route call in this process, created on first use.
+    Spawned rather than forked since the job worker that owns it runs threads, and shut
+    down when that process exits.
+    """
+    global _route_pool
+
+    if _route_pool is None:
+        _route_pool = ProcessPoolExecutor(max_workers=ROUTING_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        # multiprocessing children exit without atexit handlers but do run these finalizers;
+        # the priority puts it before the pool's own queue finalizers (priority 10)
+        multiprocessing.util.Finalize(None, shutdown_route_pool, exitpriority=100)
+
+    return _route_pool
+
+
+def shutdown_route_pool():
+    global _route_pool
+
+    if _route_pool is not None:
+        _route_pool.shutdown(cancel_futures=True)
+        _route_pool = None
+
+
+def get_best_route(geocode_address_data, n_clusters, cluster_labels, stats=None, distance_backend=None, initial_routes=None, time_budget=None, solver_settings=None):
+    """
+    Solve the route of every cluster in parallel, sharing one overall deadline.
+    distance_backend picks where distances come from (see distances.cluster_matrices);
+    "haversine" needs no network and gives a usable route in milliseconds.
+    initial_routes optionally maps a cluster to the route to start its search from
+    (see solve_cluster_route), and time_budget replaces ROUTE_TIME_BUDGET_SECONDS.
+    solver_settings are the request's solver settings (see DEFAULT_SOLVER_SETTINGS).
+    If `stats` is a dict it is filled with the wall time, each cluster's solve time and
+    time limit, and each cluster's objective over time.
+    Returns every cluster's solve_cluster_route result, by cluster.
+    """
+    matrix_stats = {}
+    cluster_distance_matrix, cluster_dict = distance_matrix(geocode_address_data, n_clusters, cluster_labels, matrix_stats, distance_backend)
+
+    routing_start = time.time()
+    deadline = routing_start + (time_budget or ROUTE_TIME_BUDGET_SECONDS)
+
+    clusters = sorted(cluster_distance_matrix)
+    initial_routes = initial_routes or {}
+
+    print("Starting solver...")
+    if len(clusters) == 1:
+        cluster_results = [solve_cluster_route(cluster_distance_matrix[clusters[0]], deadline, initial_routes.get(clusters[0]), solver_settings)]
+    else:
+        pool = get_route_pool()
+        futures = [
+            pool.submit(solve_cluster_route, cluster_distance_matrix[cluster], deadline, initial_routes.get(cluster), solver_settings)
+            for cluster in clusters
+        ]
+        cluster_results = [future.result() for future in futures]
+    print("Solver finished!")
+
+    # merging in cluster order so the result does not depend on which worker finished first
+    cluster_routes = dict(zip(clusters, cluster_results))
+
+    wall_time = time.time() - routing_start
+    cluster_solve_times = {cluster: cluster_routes[cluster]["solve_time"] for cluster in clusters}
+    print(f"Routing wall time: {wall_time:.2f}s, per cluster: {cluster_solve_times}")
+
+    if stats is not None:
+        stats.update({
+            "engine": "clusters",
+            "wall_time": wall_time,
+            "total_distance": sum(route["route_distance"] for cluster in clusters for route in cluster_routes[cluster]["routes"]),
+            "cluster_solve_times": cluster_solve_times,
+            "warm_started_clusters": [cluster for cluster in clusters if cluster_routes[cluster]["warm_start"]],
+            "solver_settings": solver_settings_with_defaults(solver_settings),
+            "cluster_time_limits": {cluster: cluster_routes[cluster]["time_limit"] for cluster in clusters},
+            "cluster_solvers": {cluster: cluster_routes[cluster]["solver"] for cluster in clusters},
+            "objective_traces": {cluster: cluster_routes[cluster]["objective_trace"] for cluster in clusters},
+            "distance_matrix": matrix_stats,
+        })
+
+    # print("Cluster Routes: ", cluster_routes)
+
+    return cluster_routes
+
+
+def solve_vrp(geocode_address_data, n_vehicles, initial_labels=None, stats=None, distance_backend=None, time_limit=None, solver_settings=None):
+    """
+    Solve one capacitated routing model over all stops with n_vehicles vehicles,
+    instead of clustering first and routing every cluster on its own.
+
+    Node 0 is a dummy depot at zero distance from every stop, so every route is an
+    open path between two stops. The "Distance" dimension from create_routing_model
+    balances route lengths, and a "Capacity" dimension caps every vehicle at
+    ceil(N / n_vehicles) stops, the same balance balanced_kmeans gives; a collapsed
+    location (see collapse_colocated) takes as much capacity as it has stops.
+    initial_labels (e.g. the k-means partition) give the initial routes, each group
+    visited in spatial order; the search starts from scratch if they do not fit.
+
+    solver_settings pick the first solution strategy, guided local search and stall
+    criterion. The time limit is time_limit if given, otherwise it scales with the number
+    of locations like in solve_cluster_route, within ROUTE_TIME_BUDGET_SECONDS.
+
+    Returns (cluster_labels, vehicle_routes) where vehicle_routes[v] has the same shape
+    as a solve_cluster_route result. If `stats` is a dict it is filled with the wall
+    time, solver statistics, the objective over time and distance matrix stats.
+    """
+    matrix_stats = {}
+    coordinates = [(location["latitude"], location["longitude"]) for location in geocode_address_data]
+    stop_matrix = to_int_matrix(distances.cluster_matrices([coordinates], distance_backend, matrix_stats)[0])
+
+    N = len(coordinates)
+    solve_start = time.time()
+
+    # dummy depot as node 0
+    int_matrix = np.zeros((N + 1, N + 1), dtype=np.int64)
+    int_matrix[1:, 1:] = stop_matrix
+
+    manager, routing = create_routing_model(int_matrix, n_vehicles, 0)
+
+    # Add Capacity Constraint
+    demands = [len(location_members(location)) for location in geocode_address_data]
+    demand_callback_index = routing.RegisterUnaryTransitVector([0] + demands)
+    routing.AddDimensionWithVehicleCapacity(
+        demand_callback_index,
+        0, # no slack
+        [int(math.ceil(sum(demands) / n_vehicles))] * n_vehicles,
+        True, # start cumul to zero
+        "Capacity"
+    )
+
+    settings = solver_settings_with_defaults(solver_settings)
+    # Same scaling as solve_cluster_route, never longer than the whole routing budget
+    time_limit = time_limit or solver_time_limit(settings, N, ROUTE_TIME_BUDGET_SECONDS)
+    search_parameters = routing_search_parameters(settings, time_limit)
+
+    objective_trace = ObjectiveTrace(routing, settings["stall_seconds"])
+    routing.AddAtSolutionCallback(objective_trace)
+
+    initial_solution = None
+    if initial_labels is not None:
+        routing.CloseModelWithParameters(search_parameters)
+
+        initial_labels = np.asarray(initial_labels)
+        initial_routes = []
+        for vehicle in range(n_vehicles):
+            members = np.flatnonzero(initial_labels == vehicle)
+            order = distances.spatial_order([coordinates[i] for i in members])
+            initial_routes.append((members[order] + 1).tolist())
+
+        initial_solution = routing.ReadAssignmentFromRoutes(initial_routes, True)
+        if initial_solution is None:
+            print("Initial routes do not fit the VRP constraints, solving from scratch")
+
+    if initial_solution is not None:
+        solution = routing.SolveFromAssignmentWithParameters(initial_solution, search_parameters)
+    else:
+        solution = routing.SolveWithParameters(search_parameters)
+
+    if not solution:
+        raise Exception("No VRP solution found")
+
+    routes, max_route_distance = extract_routes(manager, routing, solution, int_matrix, dummy_depot=True)
+    objective = solution.ObjectiveValue()
+
+    if ROUTE_DEBUG:
+        print_solution(routes, objective)
+
+    cluster_labels = np.zeros(N, dtype=int)
+    vehicle_routes = {}
+    for vehicle, route in enumerate(routes):
+        # renumber the used vehicles 0..n-1 so they can be used as group numbers
+        cluster_labels[route["indices"]] = vehicle
+        vehicle_routes[vehicle] = {
+            "routes": [route],
+            "objective": objective,
+            "max_route_distance": max_route_distance,
+        }
+
+    wall_time = time.time() - solve_start
+    solver = routing.solver()
+    print(f"VRP wall time: {wall_time:.2f}s, objective: {objective}")
+
+    if stats is not None:
+        stats.update({
+            "engine": "vrp",
+            "warm_start": initial_solution is not None,
+            "time_limit": time_limit,
+            "wall_time": wall_time,
+            "total_distance": sum(route["route_distance"] for route in routes),
+            "solver_settings": settings,
+            "objective_trace": objective_trace.trace,
+            "solver_stats": {
+                "branches": solver.Branches(),
+                "accepted_neighbors": solver.AcceptedNeighbors(),
+                "solutions": solver.Solutions(),
+            },
+            "distance_matrix": matrix_stats,
+        })
+
+    return cluster_labels, vehicle_routes
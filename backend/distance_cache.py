@@ -0,0 +1,176 @@
+import fcntl
+import json
+import os
+import threading
+
+import numpy as np
+
+DISTANCE_CACHE_DIR = os.getenv("DISTANCE_CACHE_DIR", "distance_cache")
+
+# 5 decimal places is about 1 m, well below geocoding accuracy
+COORDINATE_PRECISION = 5
+INITIAL_CAPACITY = 1024
+
+# Stored values: 0 = unknown, -1 = unroutable, otherwise distance + 1.
+# Unknown being 0 keeps the matrix file sparse on disk until it is filled in.
+UNKNOWN = 0.0
+UNROUTABLE = -1.0
+
+
+class DistanceCache:
+    """
+    Persistent pairwise distance cache for one routing profile.
+
+    Every rounded (latitude, longitude) gets a node id in an index file, and distances
+    live in a square float32 memory-mapped matrix indexed by node id, so looking up a
+    cluster's matrix is a single fancy-indexing operation. The capacity doubles when
+    the index fills up. A lock file serializes writers across uvicorn workers.
+    """
+
+    def __init__(self, profile, directory=DISTANCE_CACHE_DIR):
+        os.makedirs(directory, exist_ok=True)
+
+        self.index_path = os.path.join(directory, f"{profile}.index.json")
+        self.matrix_path = os.path.join(directory, f"{profile}.matrix")
+        self.lock_path = os.path.join(directory, f"{profile}.lock")
+
+        self.lock = threading.Lock()
+        self.nodes = {}
+        self.capacity = 0
+        self.matrix = None
+        self.index_stamp = None
+
+        with self.file_lock():
+            self.reload()
+
+    def file_lock(self):
+        return FileLock(self.lock_path, self.lock)
+
+    def reload(self):
+        """Pick up nodes (and a bigger matrix) written by other processes. Call with the lock held."""
+        if not os.path.exists(self.index_path):
+            self.nodes = {}
+            self.resize(INITIAL_CAPACITY)
+            self.save_index()
+            return
+
+        stat = os.stat(self.index_path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+
+        if stamp == self.index_stamp:
+            return
+
+        with open(self.index_path, "r") as f:
+            index = json.load(f)
+
+        self.nodes = {tuple(node): node_id for node_id, node in enumerate(index["nodes"])}
+
+        if index["capacity"] != self.capacity:
+            self.capacity = index["capacity"]
+            self.matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+", shape=(self.capacity, self.capacity))
+
+        self.index_stamp = stamp
+
+    def save_index(self):
+        nodes = sorted(self.nodes, key=self.nodes.get)
+        temp_path = self.index_path + ".tmp"
+
+        with open(temp_path, "w") as f:
+            json.dump({"capacity": self.capacity, "nodes": [list(node) for node in nodes]}, f)
+        os.replace(temp_path, self.index_path)
+
+        stat = os.stat(self.index_path)
+        self.index_stamp = (stat.st_mtime_ns, stat.st_size)
+
+    def resize(self, capacity):
+        """Grow the matrix file to capacity x capacity, keeping the known block."""
+        temp_path = self.matrix_path + ".tmp"
+        matrix = np.memmap(temp_path, dtype=np.float32, mode="w+", shape=(capacity, capacity))
+
+        if self.matrix is not None:
+            # new nodes may already be in the index, only the old matrix holds distances
+            n = min(len(self.nodes), self.capacity)
+            matrix[:n, :n] = self.matrix[:n, :n]
+
+        matrix.flush()
+        os.replace(temp_path, self.matrix_path)
+
+        self.capacity = capacity
+        self.matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+", shape=(capacity, capacity))
+
+    def node_ids(self, coordinates):
+        """Node ids for (latitude, longitude) pairs, adding new ones to the index."""
+        keys = [(round(lat, COORDINATE_PRECISION), round(lon, COORDINATE_PRECISION)) for lat, lon in coordinates]
+
+        with self.file_lock():
+            self.reload()
+
+            new_keys = [key for key in dict.fromkeys(keys) if key not in self.nodes]
+
+            if new_keys:
+                for key in new_keys:
+                    self.nodes[key] = len(self.nodes)
+
+                if len(self.nodes) > self.capacity:
+                    capacity = self.capacity
+                    while capacity < len(self.nodes):
+                        capacity *= 2
+                    self.resize(capacity)
+
+                self.save_index()
+
+            return np.array([self.nodes[key] for key in keys], dtype=np.int64)
+
+    def lookup(self, row_ids, col_ids):
+        """
+        Cached distances for every row x column pair, and a mask of the pairs that are known.
+        Unroutable pairs are NaN.
+        """
+        values = np.asarray(self.matrix[np.ix_(row_ids, col_ids)], dtype=np.float64)
+
+        known = values != UNKNOWN
+        distances = values - 1
+        distances[values == UNROUTABLE] = np.nan
+
+        return distances, known
+
+    def store(self, row_ids, col_ids, distances):
+        """Save a block of distances (NaN for unroutable pairs)."""
+        values = np.where(np.isnan(distances), UNROUTABLE, distances + 1).astype(np.float32)
+
+        with self.file_lock():
+            self.reload()
+            self.matrix[np.ix_(row_ids, col_ids)] = values
+            self.matrix.flush()
+
+
+class FileLock:
+    """Exclusive lock across threads (threading lock) and processes (flock on a lock file)."""
+
+    def __init__(self, path, thread_lock):
+        self.path = path
+        self.thread_lock = thread_lock
+        self.file = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        self.file = open(self.path, "a")
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+        self.thread_lock.release()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(profile):
+    with _caches_lock:
+        if profile not in _caches:
+            _caches[profile] = DistanceCache(profile)
+
+        return _caches[profile]
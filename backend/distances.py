@@ -0,0 +1,196 @@
+import os
+import time
+
+import numpy as np
+
+import distance_cache
+import osrm
+
+DISTANCE_BACKEND = os.getenv("DISTANCE_BACKEND", "osrm")
+
+EARTH_RADIUS_M = 6371000
+
+# Road distance is on average about 1.3x the straight-line distance
+CIRCUITY_FACTOR = float(os.getenv("CIRCUITY_FACTOR", "1.3"))
+
+# Hybrid backend: only pairs closer than this (straight line) are fetched from OSRM
+HYBRID_RADIUS_M = float(os.getenv("HYBRID_RADIUS_M", "3000"))
+HYBRID_BLOCK_SIZE = 50
+
+
+def haversine_matrix(source_coordinates, destination_coordinates=None):
+    """
+    Estimated road distances in meters: great-circle distance times CIRCUITY_FACTOR,
+    computed as one NumPy broadcast over all pairs. Coordinates are (latitude, longitude).
+    """
+    sources = np.radians(np.asarray(source_coordinates, dtype=np.float64).reshape(-1, 2))
+    destinations = sources if destination_coordinates is None else np.radians(
+        np.asarray(destination_coordinates, dtype=np.float64).reshape(-1, 2)
+    )
+
+    lat1 = sources[:, 0][:, None]
+    lon1 = sources[:, 1][:, None]
+    lat2 = destinations[:, 0][None, :]
+    lon2 = destinations[:, 1][None, :]
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1))) * CIRCUITY_FACTOR
+
+
+def osrm_matrices(coordinate_lists, stats):
+    """
+    OSRM road distances for each list of coordinates.
+    Distances already known from earlier uploads come from the distance cache;
+    only the missing rows and columns are requested from OSRM.
+    """
+    client = osrm.get_client()
+    cache = distance_cache.get_cache(client.profile)
+
+    fetches = []
+    requests_list = []
+    matrices = []
+    cached_pairs = 0
+    total_pairs = 0
+
+    for cluster, coordinates in enumerate(coordinate_lists):
+        ids = cache.node_ids(coordinates)
+        distances, known = cache.lookup(ids, ids)
+
+        matrices.append(distances)
+        cached_pairs += int(known.sum())
+        total_pairs += known.size
+
+        # stops never seen before get their whole row and column fetched; pairs of
+        # known stops that were never in the same cluster are fetched row by row
+        new_stops = ~np.diagonal(known)
+
+        if new_stops.all():
+            fetches.append((cluster, ids, slice(None), slice(None)))
+            requests_list.append((coordinates, None))
+            continue
+
+        old_stops = np.flatnonzero(~new_stops)
+        new_stops = np.flatnonzero(new_stops)
+
+        if len(new_stops):
+            fetches.append((cluster, ids, new_stops, slice(None)))
+            requests_list.append(([coordinates[r] for r in new_stops], coordinates))
+
+            fetches.append((cluster, ids, old_stops, new_stops))
+            requests_list.append(([coordinates[r] for r in old_stops], [coordinates[c] for c in new_stops]))
+
+        incomplete_rows = old_stops[~known[np.ix_(old_stops, old_stops)].all(axis=1)]
+
+        if len(incomplete_rows):
+            fetches.append((cluster, ids, incomplete_rows, old_stops))
+            requests_list.append(([coordinates[r] for r in incomplete_rows], [coordinates[c] for c in old_stops]))
+
+    fetched = client.tables(requests_list, stats) if requests_list else []
+
+    for (cluster, ids, rows, cols), block in zip(fetches, fetched):
+        row_index = np.arange(len(ids))[rows]
+        col_index = np.arange(len(ids))[cols]
+
+        matrices[cluster][np.ix_(row_index, col_index)] = block
+        cache.store(ids[row_index], ids[col_index], block)
+
+    stats.update({
+        "cached_pairs": cached_pairs,
+        "total_pairs": total_pairs,
+        "cache_hit_rate": cached_pairs / total_pairs if total_pairs else 0.0,
+    })
+
+    return matrices
+
+
+def spatial_order(coordinates):
+    """Indices of the coordinates sorted along a Z-order curve, so nearby points end up next to each other."""
+    points = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    span = np.maximum(points.max(axis=0) - points.min(axis=0), 1e-12)
+    grid = ((points - points.min(axis=0)) / span * 0xFFFF).astype(np.uint64)
+
+    codes = np.zeros(len(points), dtype=np.uint64)
+    for bit in range(16):
+        codes |= ((grid[:, 0] >> np.uint64(bit)) & np.uint64(1)) << np.uint64(2 * bit)
+        codes |= ((grid[:, 1] >> np.uint64(bit)) & np.uint64(1)) << np.uint64(2 * bit + 1)
+
+    return np.argsort(codes, kind="stable")
+
+
+def hybrid_matrices(coordinate_lists, stats, radius=HYBRID_RADIUS_M):
+    """
+    Haversine estimates for every pair, replaced by OSRM distances for nearby pairs.
+
+    Points are sorted spatially and cut into blocks; each block of sources is sent to OSRM
+    with the destination blocks (of HYBRID_BLOCK_SIZE) that have a pair closer than `radius`.
+    Far-apart pairs, where the estimate matters least, never reach OSRM.
+    """
+    client = osrm.get_client()
+    matrices = []
+    fetches = []
+    requests_list = []
+    osrm_pairs = 0
+    total_pairs = 0
+
+    for coordinates in coordinate_lists:
+        matrix = haversine_matrix(coordinates)
+        matrices.append(matrix)
+        total_pairs += matrix.size
+
+        order = spatial_order(coordinates)
+        row_blocks = [order[start:start + osrm.CHUNK_SIZE] for start in range(0, len(order), osrm.CHUNK_SIZE)]
+        col_blocks = [order[start:start + HYBRID_BLOCK_SIZE] for start in range(0, len(order), HYBRID_BLOCK_SIZE)]
+        near = matrix < radius * CIRCUITY_FACTOR
+
+        for row_block in row_blocks:
+            near_blocks = [col_block for col_block in col_blocks if near[np.ix_(row_block, col_block)].any()]
+            cols = np.concatenate(near_blocks)
+
+            fetches.append((matrix, row_block, cols))
+            requests_list.append(([coordinates[r] for r in row_block], [coordinates[c] for c in cols]))
+            osrm_pairs += len(row_block) * len(cols)
+
+    fetched = client.tables(requests_list, stats) if requests_list else []
+
+    for (matrix, rows, cols), block in zip(fetches, fetched):
+        matrix[np.ix_(rows, cols)] = block
+
+    stats.update({
+        "osrm_pairs": osrm_pairs,
+        "total_pairs": total_pairs,
+    })
+
+    return matrices
+
+
+def cluster_matrices(coordinate_lists, backend=None, stats=None):
+    """
+    Distance matrix in meters for each list of (latitude, longitude) coordinates.
+
+    backend (default DISTANCE_BACKEND):
+      "osrm"      road distances from OSRM, through the distance cache
+      "haversine" offline estimate, no network at all
+      "hybrid"    haversine estimate with OSRM distances for nearby pairs
+
+    If `stats` is a dict it is filled with the backend used, OSRM request counts and timing.
+    """
+    backend = backend or DISTANCE_BACKEND
+    matrix_stats = {"backend": backend, "osrm_requests": 0}
+    matrix_start = time.time()
+
+    if backend == "osrm":
+        matrices = osrm_matrices(coordinate_lists, matrix_stats)
+    elif backend == "haversine":
+        matrices = [haversine_matrix(coordinates) for coordinates in coordinate_lists]
+    elif backend == "hybrid":
+        matrices = hybrid_matrices(coordinate_lists, matrix_stats)
+    else:
+        raise ValueError(f"Unknown distance backend: {backend}")
+
+    matrix_stats["seconds"] = time.time() - matrix_start
+    print("distance matrix stats: ", matrix_stats)
+
+    if stats is not None:
+        stats.update(matrix_stats)
+
+    return matrices
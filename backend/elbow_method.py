@@ -0,0 +1,111 @@
+import os
+
+import matplotlib.pyplot as plt
+import matplotlib
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.cluster import KMeans, kmeans_plusplus
+from sklearn.metrics import silhouette_score
+
+# K candidates are fitted in parallel
+SUGGEST_K_WORKERS = int(os.getenv("SUGGEST_K_WORKERS", str(os.cpu_count() or 1)))
+DEFAULT_MAX_K = 10
+SILHOUETTE_SAMPLE_SIZE = 2000
+
+def elbow_method_graph(x):
+    # Elbow Method for optimal K
+    # We will test K from 1 to 10
+    max_k = 10
+    inertia = []
+
+    for k in range(1, max_k + 1):
+        kmeans_test = KMeans(n_clusters=k, random_state=42, n_init=10)
+        kmeans_test.fit(x)
+        inertia.append(kmeans_test.inertia_)
+
+    plt.figure(figsize=(10, 6))
+    plt.plot(range(1, max_k + 1), inertia, marker='o')
+    plt.title('Elbow Method for Optimal K')
+    plt.xlabel('Number of Clusters (K)')
+    plt.ylabel('Inertia')
+    plt.xticks(range(1, max_k + 1))
+    plt.grid(True)
+    plt.show()
+
+
+def fit_k(x, seeds, k, metric, random_state):
+    """Fit one candidate K starting from the first k seeds and return its score."""
+    kmeans = KMeans(n_clusters=k, init=seeds[:k], n_init=1, random_state=random_state)
+    labels = kmeans.fit_predict(x)
+
+    if metric == "inertia":
+        return float(kmeans.inertia_)
+
+    # silhouette needs at least 2 clusters
+    if k < 2:
+        return None
+
+    return float(silhouette_score(x, labels, sample_size=min(len(x), SILHOUETTE_SAMPLE_SIZE), random_state=random_state))
+
+
+def find_knee(ks, scores):
+    """
+    K at the elbow of a decreasing inertia curve: the point farthest below the straight
+    line between the first and last point once both axes are scaled to 0..1.
+    """
+    if len(ks) < 3:
+        return ks[0]
+
+    k_scaled = (np.array(ks) - ks[0]) / (ks[-1] - ks[0])
+    score_range = scores[0] - scores[-1]
+    if score_range <= 0:
+        return ks[0]
+
+    score_scaled = (np.array(scores) - scores[-1]) / score_range
+
+    # the line runs from (0, 1) to (1, 0), so the distance below it is 1 - k - score
+    return ks[int(np.argmax(1 - k_scaled - score_scaled))]
+
+
+def suggest_k(x, min_k=1, max_k=DEFAULT_MAX_K, metric="inertia", sample_size=None, random_state=42):
+    """
+    Suggest a number of groups for the points in x without plotting anything.
+
+    Candidates min_k..max_k are fitted in parallel. All of them start from one shared
+    k-means++ seeding for max_k, so the fit for K warm-starts from the centroids the
+    seeding picked for K - 1 plus one more, and each needs a single run instead of n_init=10.
+    With sample_size only that many random points are used.
+
+    metric is "inertia" (recommended K at the knee of the curve) or "silhouette"
+    (recommended K with the highest score).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    rng = np.random.default_rng(random_state)
+
+    if sample_size and sample_size < len(x):
+        x = x[rng.choice(len(x), sample_size, replace=False)]
+
+    max_k = min(max_k, len(x))
+    min_k = max(min_k, 2 if metric == "silhouette" else 1)
+    if min_k > max_k:
+        raise ValueError(f"Need at least {min_k} distinct points to suggest a number of groups")
+
+    seeds, _ = kmeans_plusplus(x, n_clusters=max_k, random_state=random_state)
+    ks = list(range(min_k, max_k + 1))
+
+    scores = Parallel(n_jobs=min(SUGGEST_K_WORKERS, len(ks)), prefer="threads")(
+        delayed(fit_k)(x, seeds, k, metric, random_state) for k in ks
+    )
+
+    if metric == "inertia":
+        recommended_k = find_knee(ks, scores)
+    else:
+        recommended_k = ks[int(np.argmax(scores))]
+
+    return {
+        "metric": metric,
+        "points": len(x),
+        "k_values": ks,
+        "scores": scores,
+        "recommended_k": recommended_k,
+    }
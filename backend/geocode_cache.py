@@ -0,0 +1,252 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import address_normalization
+
+CACHE_DB = os.getenv("GEOCODE_CACHE_DB", "geocode_cache.db")
+LEGACY_CACHE_FILE = "geocode_cache.json"
+
+# Failed lookups are retried once they are older than this
+ERROR_TTL_SECONDS = int(os.getenv("GEOCODE_ERROR_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Near-duplicate lookups before going to the network: same street exactly, similar city/state/zip
+FUZZY_MATCH_ENABLED = os.getenv("GEOCODE_FUZZY_MATCH", "1") == "1"
+FUZZY_MATCH_THRESHOLD = float(os.getenv("GEOCODE_FUZZY_THRESHOLD", "0.8"))
+
+# SQLite limits the number of bound parameters per statement
+QUERY_CHUNK_SIZE = 500
+
+# Bumped whenever existing rows need to be migrated
+SCHEMA_VERSION = 2
+
+
+class GeocodeCache:
+    """
+    Persistent geocode cache backed by SQLite.
+
+    Entries are keyed by address_normalization.normalize_address. Lookups go through the
+    primary key index and new entries are written in a single transaction per batch.
+    WAL mode lets several uvicorn workers share the same file.
+
+    Successful entries are also indexed by street (see address_normalization.street_key)
+    so near-duplicate spellings can be found with find_similar.
+    """
+
+    def __init__(self, path=CACHE_DB, error_ttl=ERROR_TTL_SECONDS):
+        self.path = path
+        self.error_ttl = error_ttl
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS geocode_cache (
+                    address TEXT PRIMARY KEY,
+                    latitude REAL,
+                    longitude REAL,
+                    full_result TEXT,
+                    error INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS geocode_streets (
+                    street TEXT NOT NULL,
+                    address TEXT NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_geocode_streets_street ON geocode_streets(street)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_geocode_streets_address ON geocode_streets(address)")
+
+        self.migrate()
+        self.import_legacy_cache()
+        self.evict_expired_errors()
+
+    def migrate(self):
+        """
+        Re-key rows written before addresses were normalized (version 1) and replace
+        the trigram index with the street index (version 2).
+        """
+        with self.lock:
+            version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+            if version >= SCHEMA_VERSION:
+                return
+
+            rows = self.conn.execute(
+                "SELECT address, latitude, longitude, full_result, error FROM geocode_cache"
+            ).fetchall()
+
+            with self.conn:
+                self.conn.execute("DELETE FROM geocode_cache")
+                self.conn.execute("DELETE FROM geocode_streets")
+                self.conn.execute("DROP TABLE IF EXISTS geocode_trigrams")
+
+        entries = {}
+        for address, latitude, longitude, full_result, error in rows:
+            entry = {"address": address, "error": True} if error else {
+                "address": address,
+                "latitude": latitude,
+                "longitude": longitude,
+                "full_result": full_result,
+            }
+            # version 1 keys are already normalized, so this keeps them as they are
+            entries[address_normalization.normalize_address(address)] = entry
+
+        self.put_many(entries)
+
+        with self.lock:
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def import_legacy_cache(self, legacy_file=LEGACY_CACHE_FILE):
+        """One-time import of the old whole-file JSON cache."""
+        if not os.path.exists(legacy_file):
+            return
+
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM geocode_cache LIMIT 1").fetchone():
+                return
+
+        with open(legacy_file, "r") as f:
+            legacy_cache = json.load(f)
+
+        self.put_many({
+            address_normalization.normalize_address(address): entry
+            for address, entry in legacy_cache.items()
+        })
+        print(f"[CACHE] Imported {len(legacy_cache)} entries from {legacy_file}")
+
+    def get_many(self, keys):
+        """Return a dict of key -> entry for every cached key. Expired failures are treated as missing."""
+        unique_keys = list(dict.fromkeys(keys))
+        error_cutoff = time.time() - self.error_ttl
+        entries = {}
+
+        with self.lock:
+            for start in range(0, len(unique_keys), QUERY_CHUNK_SIZE):
+                chunk = unique_keys[start:start + QUERY_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT address, latitude, longitude, full_result, error, created_at "
+                    f"FROM geocode_cache WHERE address IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+
+                for address, latitude, longitude, full_result, error, created_at in rows:
+                    if error:
+                        if created_at < error_cutoff:
+                            continue
+                        entries[address] = {"address": address, "error": True}
+                    else:
+                        entries[address] = {
+                            "address": address,
+                            "latitude": latitude,
+                            "longitude": longitude,
+                            "full_result": full_result,
+                        }
+
+        return entries
+
+    def find_similar(self, key, threshold=FUZZY_MATCH_THRESHOLD):
+        """
+        Return (cached_key, entry, score) for the closest successfully geocoded address, or None.
+
+        Candidates must have exactly the same street (house number, directionals, street
+        name and suffix, see address_normalization.street_key) and the same numbers as
+        `key`; only the rest of the address (city, state) is scored by trigram similarity.
+        """
+        split = address_normalization.street_key(key)
+
+        if split is None:
+            return None
+
+        street, rest = split
+        key_numbers = address_normalization.house_numbers(key)
+
+        with self.lock:
+            candidates = self.conn.execute(
+                "SELECT address FROM geocode_streets WHERE street = ?", (street,)
+            ).fetchall()
+
+        best = None
+        for (candidate,) in candidates:
+            if candidate == key or address_normalization.house_numbers(candidate) != key_numbers:
+                continue
+
+            score = address_normalization.similarity(rest, address_normalization.street_key(candidate)[1])
+
+            if score >= threshold and (best is None or score > best[1]):
+                best = (candidate, score)
+
+        if best is None:
+            return None
+
+        entry = self.get_many([best[0]]).get(best[0])
+        if entry is None or entry.get("error"):
+            return None
+
+        return best[0], entry, best[1]
+
+    def put_many(self, entries):
+        """Insert or replace a batch of key -> entry pairs in one transaction."""
+        now = time.time()
+        rows = [
+            (
+                key,
+                entry.get("latitude"),
+                entry.get("longitude"),
+                entry.get("full_result"),
+                1 if entry.get("error") else 0,
+                now,
+            )
+            for key, entry in entries.items()
+        ]
+
+        street_rows = []
+        for key, entry in entries.items():
+            split = address_normalization.street_key(key)
+            if split and not entry.get("error"):
+                street_rows.append((split[0], key))
+
+        if not rows:
+            return
+
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO geocode_cache "
+                "(address, latitude, longitude, full_result, error, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.conn.executemany("DELETE FROM geocode_streets WHERE address = ?", [(row[0],) for row in rows])
+            self.conn.executemany("INSERT INTO geocode_streets (street, address) VALUES (?, ?)", street_rows)
+
+    def evict_expired_errors(self):
+        """Delete failed lookups older than the TTL so they are retried. Returns the number removed."""
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM geocode_cache WHERE error = 1 AND created_at < ?",
+                (time.time() - self.error_ttl,),
+            )
+
+        return cursor.rowcount
+
+
+# One connection per process, shared by all requests
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = GeocodeCache()
+
+        return _cache
@@ -0,0 +1,284 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from geopy.geocoders import Nominatim
+from geopy.exc import GeocoderServiceError
+
+GEOLOCATOR_TIMEOUT = 10
+USER_AGENT = "BNNP_Flags"
+
+# Public Nominatim usage policy: at most 1 request per second, no bulk parallel requests
+PUBLIC_NOMINATIM_DOMAIN = "nominatim.openstreetmap.org"
+PUBLIC_NOMINATIM_RATE = 1.0
+
+# The public server's limit is shared by every process (API, job workers) through this file
+RATE_LIMIT_DB = os.getenv("GEOCODER_RATE_LIMIT_DB", "geocoder_rate_limit.db")
+
+# Defaults for providers we control (self-hosted Nominatim, local stand-in)
+SELF_HOSTED_RATE = float(os.getenv("GEOCODER_RATE", "50"))
+SELF_HOSTED_WORKERS = int(os.getenv("GEOCODER_WORKERS", "8"))
+
+# Finished lookups are handed back in batches of this size so they can be cached as they come in
+RESULT_BATCH_SIZE = 50
+
+# Progress is reported at most every this many lookups or seconds (every report is a job event)
+PROGRESS_EVERY = 50
+PROGRESS_SECONDS = 5
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+    Tokens refill continuously at `rate` per second, up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class SharedTokenBucket:
+    """
+    Token bucket kept in a SQLite file, so that all processes using the same file share
+    one limit. Same interface as TokenBucket; the bucket is identified by `name`.
+    """
+
+    def __init__(self, name, rate, capacity=1, path=RATE_LIMIT_DB):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS token_buckets (
+                name TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                last_refill REAL NOT NULL
+            )
+        """)
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            with self.lock:
+                # BEGIN IMMEDIATE takes the write lock, so reading and taking a token is atomic across processes
+                self.conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = self.conn.execute(
+                        "SELECT tokens, last_refill FROM token_buckets WHERE name = ?", (self.name,)
+                    ).fetchone()
+
+                    # wall clock, monotonic clocks cannot be compared between processes
+                    now = time.time()
+                    tokens = self.capacity if row is None else min(self.capacity, row[0] + max(0, now - row[1]) * self.rate)
+
+                    if tokens >= 1:
+                        self.conn.execute(
+                            "INSERT OR REPLACE INTO token_buckets (name, tokens, last_refill) VALUES (?, ?, ?)",
+                            (self.name, tokens - 1, now),
+                        )
+                        wait = 0
+                    else:
+                        wait = (1 - tokens) / self.rate
+                except Exception:
+                    self.conn.execute("ROLLBACK")
+                    raise
+                self.conn.execute("COMMIT")
+
+            if not wait:
+                return
+
+            time.sleep(wait)
+
+
+class NominatimProvider:
+    """
+    Nominatim geocoder, either the public server or a self-hosted instance.
+    The public server is always limited to 1 req/s with a single worker, shared by all
+    processes through RATE_LIMIT_DB.
+    """
+
+    def __init__(self, domain=PUBLIC_NOMINATIM_DOMAIN, scheme="https", rate=None, max_workers=None):
+        self.name = f"nominatim:{domain}"
+        self.geolocator = Nominatim(user_agent=USER_AGENT, timeout=GEOLOCATOR_TIMEOUT, domain=domain, scheme=scheme) # type: ignore
+
+        if domain == PUBLIC_NOMINATIM_DOMAIN:
+            self.max_workers = 1
+            self.bucket = SharedTokenBucket(domain, PUBLIC_NOMINATIM_RATE)
+        else:
+            self.max_workers = max_workers or SELF_HOSTED_WORKERS
+            self.bucket = TokenBucket(rate or SELF_HOSTED_RATE)
+
+    def geocode(self, address):
+        """Return (latitude, longitude, full_result) or None if the address was not found."""
+        location = self.geolocator.geocode(address)
+
+        if not location:
+            return None
+
+        return location.latitude, location.longitude, location.address
+
+
+class FakeProvider:
+    """
+    Local stand-in for a geocoder, for offline development and benchmarks.
+    Every address maps to a deterministic point around Madison, WI.
+    """
+
+    def __init__(self, center=(43.0731, -89.4012), spread=0.15, latency=0.0, rate=None, max_workers=None):
+        self.name = "fake"
+        self.center = center
+        self.spread = spread
+        self.latency = latency
+        self.max_workers = max_workers or SELF_HOSTED_WORKERS
+        self.bucket = TokenBucket(rate or 1000, capacity=max(1, self.max_workers))
+
+    def geocode(self, address):
+        if self.latency:
+            time.sleep(self.latency)
+
+        digest = hashlib.sha1(address.encode("utf-8")).digest()
+        lat_offset = (int.from_bytes(digest[:4], "big") / 0xFFFFFFFF - 0.5) * 2 * self.spread
+        lon_offset = (int.from_bytes(digest[4:8], "big") / 0xFFFFFFFF - 0.5) * 2 * self.spread
+
+        return self.center[0] + lat_offset, self.center[1] + lon_offset, f"{address} (fake)"
+
+
+# Providers are shared per process so concurrent uploads share the same rate limit
+# (the public Nominatim limit is also shared with other processes, see SharedTokenBucket)
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name=None):
+    """
+    Return the configured geocoding provider.
+
+    GEOCODER_PROVIDER selects "nominatim" (default) or "fake".
+    NOMINATIM_DOMAIN / NOMINATIM_SCHEME point the nominatim provider at a self-hosted server.
+    """
+    name = name or os.getenv("GEOCODER_PROVIDER", "nominatim")
+
+    with _providers_lock:
+        if name not in _providers:
+            if name == "nominatim":
+                _providers[name] = NominatimProvider(
+                    domain=os.getenv("NOMINATIM_DOMAIN", PUBLIC_NOMINATIM_DOMAIN),
+                    scheme=os.getenv("NOMINATIM_SCHEME", "https"),
+                )
+            elif name == "fake":
+                _providers[name] = FakeProvider()
+            else:
+                raise ValueError(f"Unknown geocoding provider: {name}")
+
+        return _providers[name]
+
+
+class GeocodingEngine:
+    """
+    Geocodes batches of addresses concurrently while respecting the provider's rate limit.
+    Each distinct address is only requested once per batch.
+    """
+
+    def __init__(self, provider):
+        self.provider = provider
+
+    def geocode_one(self, address):
+        """
+        Geocode a single address.
+        Returns a cache entry (success or failure format), or None on a service error
+        (timeout, rate limit, server or connection error) so that the address is retried
+        next time instead of being cached as a failure.
+        """
+        self.provider.bucket.acquire()
+
+        try:
+            result = self.provider.geocode(address)
+        except GeocoderServiceError as e:
+            print(f"ERROR: '{address}' ({e})")
+            return None
+
+        if result:
+            latitude, longitude, full_result = result
+            entry = {
+                "address": address,
+                "latitude": latitude,
+                "longitude": longitude,
+                "full_result": full_result,
+            }
+            print(f"[API] Found {address} at {entry['latitude']}, {entry['longitude']}")
+        else:
+            entry = {
+                "address": address,
+                "error": True,
+            }
+            print(f"[API] FAILED: could not find {address}")
+
+        return entry
+
+    def geocode_many(self, addresses, progress=None, on_results=None):
+        """
+        Return a dict of address -> entry (or None) for every distinct address.
+        progress(done, total) is called every PROGRESS_EVERY lookups or PROGRESS_SECONDS
+        seconds, whichever comes first, and after the last lookup, if given.
+        on_results(results) gets the finished lookups every RESULT_BATCH_SIZE addresses
+        and at the end, so they can be saved even if a later lookup fails.
+        """
+        unique_addresses = list(dict.fromkeys(addresses))
+        results = {}
+
+        if not unique_addresses:
+            return results
+
+        workers = min(self.provider.max_workers, len(unique_addresses))
+        batch = {}
+        reported, reported_at = 0, time.monotonic()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(self.geocode_one, address): address for address in unique_addresses}
+
+            for future in as_completed(futures):
+                results[futures[future]] = batch[futures[future]] = future.result()
+
+                if on_results and len(batch) >= RESULT_BATCH_SIZE:
+                    on_results(batch)
+                    batch = {}
+
+                done = len(results)
+                if progress and (
+                    done == len(unique_addresses)
+                    or done - reported >= PROGRESS_EVERY
+                    or time.monotonic() - reported_at >= PROGRESS_SECONDS
+                ):
+                    progress(done, len(unique_addresses))
+                    reported, reported_at = done, time.monotonic()
+
+        if on_results and batch:
+            on_results(batch)
+
+        # keep the input order
+        return {address: results[address] for address in unique_addresses}
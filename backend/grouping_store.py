@@ -0,0 +1,297 @@
+import asyncio
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from supabase import create_client
+
+# "supabase" (default) or "sqlite", a local file with the same groupings table for offline use
+GROUPINGS_BACKEND = os.getenv("GROUPINGS_BACKEND", "supabase")
+GROUPINGS_DB = os.getenv("GROUPINGS_DB", "groupings.db")
+
+# Failed database calls are retried after 0.5 s, 1 s, ...
+STORE_RETRIES = 3
+STORE_BACKOFF_SECONDS = 0.5
+
+# Write-behind: auto-saves are inserted in batches of up to this many records
+WRITE_BATCH_SIZE = 50
+WRITE_RETRY_SECONDS = 30
+
+
+class SupabaseGroupings:
+    """The groupings table in Supabase (see supabase_schema.sql)."""
+
+    def __init__(self, url, key):
+        self.client = create_client(url, key)
+
+    def insert(self, records):
+        """Insert records and return their ids."""
+        result = self.client.table("groupings").insert(records).execute()
+        return [row["id"] for row in result.data]
+
+    def list(self, columns, limit, before=None):
+        query = self.client.table("groupings").select(columns).order("created_at", desc=True).order("id", desc=True)
+
+        if before:
+            created_at, grouping_id = before
+            query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{grouping_id}")')
+
+        return query.limit(limit).execute().data
+
+    def get(self, grouping_id):
+        result = self.client.table("groupings").select("*").eq("id", grouping_id).execute()
+        return result.data[0] if result.data else None
+
+    def delete(self, grouping_id):
+        """Delete a grouping. Returns False if it did not exist."""
+        result = self.client.table("groupings").delete().eq("id", grouping_id).execute()
+        return bool(result.data)
+
+
+class SQLiteGroupings:
+    """
+    The groupings table in a local SQLite file, so the API runs without Supabase.
+
+    Same columns as supabase_schema.sql with the JSON columns stored as text, and
+    created_at as an ISO timestamp that sorts like the Postgres one.
+    """
+
+    JSON_COLUMNS = ("columns", "groups", "routes")
+
+    def __init__(self, path=GROUPINGS_DB):
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS groupings (
+                id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                number_of_groups INTEGER NOT NULL,
+                columns TEXT NOT NULL,
+                groups TEXT NOT NULL,
+                routes TEXT,
+                created_at TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("DROP INDEX IF EXISTS idx_groupings_created_at")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_groupings_created_at_id ON groupings(created_at DESC, id DESC)")
+
+    def insert(self, records):
+        rows = []
+        for record in records:
+            rows.append((
+                str(uuid.uuid4()),
+                record["filename"],
+                record["number_of_groups"],
+                json.dumps(record["columns"]),
+                json.dumps(record["groups"]),
+                None if record.get("routes") is None else json.dumps(record["routes"]),
+                datetime.now(timezone.utc).isoformat(timespec="microseconds"),
+            ))
+
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(
+                    "INSERT INTO groupings (id, filename, number_of_groups, columns, groups, routes, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+        return [row[0] for row in rows]
+
+    def list(self, columns, limit, before=None):
+        # columns is one of the fixed column lists from app.py, never user input
+        sql = f"SELECT {columns} FROM groupings"
+        params = []
+
+        if before:
+            sql += " WHERE (created_at, id) < (?, ?)"
+            params.extend(before)
+
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+
+        return [self.decode(row) for row in rows]
+
+    def get(self, grouping_id):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM groupings WHERE id = ?", (grouping_id,)).fetchone()
+
+        return self.decode(row) if row else None
+
+    def delete(self, grouping_id):
+        with self.lock:
+            cursor = self.conn.execute("DELETE FROM groupings WHERE id = ?", (grouping_id,))
+
+        return cursor.rowcount > 0
+
+    def decode(self, row):
+        record = dict(row)
+
+        for column in self.JSON_COLUMNS:
+            if record.get(column) is not None:
+                record[column] = json.loads(record[column])
+
+        return record
+
+
+def with_retries(call, *args):
+    """call(*args), retried with exponential backoff; the last failure is raised."""
+    for attempt in range(STORE_RETRIES):
+        try:
+            return call(*args)
+        except Exception as e:
+            if attempt == STORE_RETRIES - 1:
+                raise
+
+            print(f"Warning: groupings database call failed ({e}), retrying")
+            time.sleep(STORE_BACKOFF_SECONDS * 2 ** attempt)
+
+
+class GroupingStore:
+    """
+    Saved groupings for the API, on top of a SupabaseGroupings or SQLiteGroupings backend.
+
+    Every database call runs in a worker thread with retries, so it never blocks the
+    event loop. Auto-saves of finished uploads go through a write-behind buffer
+    (save_later): a background thread inserts them in batches and keeps failed batches
+    to try again every WRITE_RETRY_SECONDS, so a database outage does not lose them
+    while the process runs. The buffer is flushed at exit.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.pending = queue.Queue()
+        self.stats = {"saved": 0, "failed_attempts": 0}
+        self.stopping = threading.Event()
+        self.writer = None
+
+    def start(self):
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+        atexit.register(self.flush)
+
+    async def insert(self, record):
+        """Save a grouping right away and return its id."""
+        return (await asyncio.to_thread(with_retries, self.backend.insert, [record]))[0]
+
+    async def list(self, columns, limit, before=None):
+        """
+        Newest groupings first, only `columns`. `before` is a (created_at, id) cursor; ties
+        on created_at are ordered by id, so only the groupings after that row are returned.
+        """
+        return await asyncio.to_thread(with_retries, self.backend.list, columns, limit, before)
+
+    async def get(self, grouping_id):
+        """A whole grouping, or None if it does not exist."""
+        return await asyncio.to_thread(with_retries, self.backend.get, grouping_id)
+
+    async def delete(self, grouping_id):
+        """Delete a grouping. Returns False if it did not exist."""
+        return await asyncio.to_thread(with_retries, self.backend.delete, grouping_id)
+
+    def save_later(self, record):
+        """Queue a grouping to be saved by the write-behind thread. Never blocks or raises."""
+        self.pending.put(record)
+
+    def pending_count(self):
+        return self.pending.qsize()
+
+    def health(self):
+        """Write-behind buffer state: groupings saved, failed batch attempts and still queued."""
+        return {**self.stats, "pending": self.pending_count()}
+
+    def _next_batch(self, timeout=None):
+        """Up to WRITE_BATCH_SIZE queued records, waiting up to `timeout` for the first one."""
+        try:
+            batch = [self.pending.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+
+        while len(batch) < WRITE_BATCH_SIZE:
+            try:
+                batch.append(self.pending.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _write(self, batch):
+        """Insert a batch; on failure put it back in the buffer. Returns whether it was saved."""
+        try:
+            with_retries(self.backend.insert, batch)
+        except Exception as e:
+            self.stats["failed_attempts"] += 1
+            print(f"Warning: Failed to auto-save {len(batch)} groupings to database, will retry: {str(e)}")
+
+            for record in batch:
+                self.pending.put(record)
+            return False
+
+        self.stats["saved"] += len(batch)
+        return True
+
+    def _write_loop(self):
+        while not self.stopping.is_set():
+            batch = self._next_batch(timeout=1)
+
+            if batch and not self._write(batch):
+                self.stopping.wait(WRITE_RETRY_SECONDS)
+
+    def flush(self):
+        """
+        Stop the write-behind thread, then save everything queued so far (one attempt per
+        batch), e.g. at shutdown. A batch the thread was writing is either saved or back
+        in the buffer by the time it stops.
+        """
+        self.stopping.set()
+        if self.writer is not None:
+            self.writer.join()
+
+        for _ in range(self.pending.qsize()):
+            batch = self._next_batch(timeout=0)
+
+            if not batch or not self._write(batch):
+                break
+
+        if self.pending.qsize():
+            print(f"Warning: {self.pending.qsize()} groupings could not be saved to database")
+
+
+def create_store(backend=None):
+    """
+    GroupingStore for GROUPINGS_BACKEND: "supabase" (needs SUPABASE_URL and SUPABASE_KEY)
+    or "sqlite" (GROUPINGS_DB file).
+    """
+    backend = backend or GROUPINGS_BACKEND
+
+    if backend == "supabase":
+        supabase_url = os.getenv("SUPABASE_URL")
+        supabase_key = os.getenv("SUPABASE_KEY")
+
+        if not supabase_url or not supabase_key:
+            raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in .env file")
+
+        return GroupingStore(SupabaseGroupings(supabase_url, supabase_key))
+
+    if backend == "sqlite":
+        return GroupingStore(SQLiteGroupings(GROUPINGS_DB))
+
+    raise ValueError(f"Unknown groupings backend: {backend}")
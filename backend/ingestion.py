@@ -0,0 +1,90 @@
+import importlib.util
+from io import BytesIO
+
+import pandas as pd
+
+REQUIRED_COLUMNS = ["Address", "City", "State"]
+SPREADSHEET_EXTENSIONS = (".csv", ".xlsx", ".xls")
+
+# Only this many row errors are returned, a broken file could otherwise have one per row
+MAX_ROW_ERRORS = 100
+
+# Spreadsheet row of the first data row (row 1 is the header)
+FIRST_DATA_ROW = 2
+
+# Faster parsers, used when installed
+CSV_ENGINE = "pyarrow" if importlib.util.find_spec("pyarrow") else "c"
+EXCEL_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") else None
+
+
+def read_spreadsheet(filename, contents, extra_columns=()):
+    """
+    Parse an uploaded CSV/Excel file into a DataFrame of the required columns.
+
+    Only REQUIRED_COLUMNS and the extra_columns that exist in the file are read, all as
+    strings, with the pyarrow CSV parser and the calamine Excel reader when installed.
+    Raises ValueError if the file type is not supported, it cannot be parsed or a
+    required column is missing.
+
+    Returns (df, row_errors) where row_errors lists the missing address fields of the
+    first MAX_ROW_ERRORS bad rows (see validate_rows) as {"row", "column", "error",
+    "skipped"}, with the spreadsheet row number.
+    """
+    name = filename.lower()
+    if not name.endswith(SPREADSHEET_EXTENSIONS):
+        raise ValueError("Unsupported file type")
+
+    wanted = REQUIRED_COLUMNS + [column for column in extra_columns if column and column not in REQUIRED_COLUMNS]
+
+    try:
+        if name.endswith(".csv"):
+            # the header alone tells which columns there are, before parsing any rows
+            columns = pd.read_csv(BytesIO(contents), nrows=0).columns
+            check_columns(columns)
+
+            usecols = [column for column in wanted if column in columns]
+            df = pd.read_csv(BytesIO(contents), usecols=usecols, dtype=str, engine=CSV_ENGINE)
+        else:
+            df = pd.read_excel(BytesIO(contents), usecols=lambda column: column in wanted, dtype=str, engine=EXCEL_ENGINE)
+            check_columns(df.columns)
+    except Exception as e:
+        raise ValueError(f"Could not read spreadsheet: {e}")
+
+    return validate_rows(df)
+
+
+def check_columns(columns):
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+
+def validate_rows(df):
+    """
+    Strip the address columns and report rows with a missing Address (left out) or a
+    missing City or State (kept, the address is built without it). Blank rows are left
+    out silently.
+    """
+    missing = {}
+    for column in REQUIRED_COLUMNS:
+        df[column] = df[column].fillna("").str.strip()
+        missing[column] = (df[column] == "").to_numpy()
+
+    blank = missing["Address"] & missing["City"] & missing["State"]
+
+    row_errors = []
+    for row in (~blank & (missing["Address"] | missing["City"] | missing["State"])).nonzero()[0][:MAX_ROW_ERRORS]:
+        for column in REQUIRED_COLUMNS:
+            if missing[column][row]:
+                row_errors.append({
+                    "row": int(row) + FIRST_DATA_ROW,
+                    "column": column,
+                    "error": "missing",
+                    "skipped": bool(missing["Address"][row]),
+                })
+
+    if missing["Address"].any():
+        df = df[~missing["Address"]].reset_index(drop=True)
+
+    return df, row_errors
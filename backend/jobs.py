@@ -0,0 +1,353 @@
+import importlib
+import json
+import multiprocessing
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+JOBS_DB = os.getenv("JOBS_DB", "jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+DISPATCH_POLL_SECONDS = 0.5
+
+FINISHED_STATUSES = ("done", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobStore:
+    """
+    Persistent job queue backed by SQLite.
+
+    Holds the queued work (task name and pickled arguments), the status of every job,
+    its progress events and its JSON result. Shared by the API process and the workers.
+    """
+
+    def __init__(self, path=JOBS_DB):
+        self.path = path
+        self.lock = threading.Lock()
+
+        # autocommit; transactions that need it are started explicitly
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                task TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                owner_pid INTEGER,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                data TEXT NOT NULL,
+                time REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created_at ON jobs(status, created_at)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_job_events_job_id ON job_events(job_id, seq)")
+
+    def create(self, task, args):
+        job_id = str(uuid.uuid4())
+        now = time.time()
+
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO jobs (id, task, payload, status, created_at, updated_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, task, pickle.dumps(args), now, now),
+            )
+
+        self.add_event(job_id, "status", {"status": "queued"})
+        return job_id
+
+    def claim_next(self, owner_pid):
+        """Atomically move the oldest queued job to running and return its id, or None."""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+
+                if row:
+                    self.conn.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, owner_pid = ?, updated_at = ? WHERE id = ?",
+                        (owner_pid, time.time(), row[0]),
+                    )
+            finally:
+                self.conn.execute("COMMIT")
+
+        if row is None:
+            return None
+
+        self.add_event(row[0], "status", {"status": "running"})
+        return row[0]
+
+    def requeue_orphans(self):
+        """Put back running jobs whose owning process is gone, e.g. after a crash or restart."""
+        with self.lock:
+            rows = self.conn.execute("SELECT id, owner_pid FROM jobs WHERE status = 'running'").fetchall()
+
+        for job_id, owner_pid in rows:
+            if owner_pid and pid_alive(owner_pid):
+                continue
+
+            with self.lock:
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'queued', updated_at = ? WHERE id = ? AND status = 'running'",
+                    (time.time(), job_id),
+                )
+            self.add_event(job_id, "status", {"status": "queued"})
+
+    def load(self, job_id):
+        with self.lock:
+            task, payload = self.conn.execute("SELECT task, payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+        return task, pickle.loads(payload)
+
+    def finish(self, job_id, status, result=None, error=None):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, None if result is None else json.dumps(result), error, time.time(), job_id),
+            )
+
+        self.add_event(job_id, "status", {"status": status})
+
+    def cancel(self, job_id):
+        """
+        Cancel a job. Queued jobs are cancelled right away; running jobs stop at
+        their next progress update. Returns the status after the request.
+        """
+        now = time.time()
+
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status = 'queued'",
+                (now, job_id),
+            )
+            if cursor.rowcount == 0:
+                self.conn.execute(
+                    "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND status = 'running'",
+                    (now, job_id),
+                )
+
+        if cursor.rowcount:
+            self.add_event(job_id, "status", {"status": "cancelled"})
+            return "cancelled"
+
+        return self.get_status(job_id)
+
+    def retry(self, job_id):
+        """Queue a failed or cancelled job again. Returns False if the job is not in one of those states."""
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = 'queued', cancel_requested = 0, result = NULL, error = NULL, updated_at = ? "
+                "WHERE id = ? AND status IN ('failed', 'cancelled')",
+                (time.time(), job_id),
+            )
+
+        if cursor.rowcount == 0:
+            return False
+
+        self.add_event(job_id, "status", {"status": "queued"})
+        return True
+
+    def cancel_requested(self, job_id):
+        with self.lock:
+            row = self.conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+        return bool(row and row[0])
+
+    def add_event(self, job_id, stage, data):
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO job_events (job_id, stage, data, time) VALUES (?, ?, ?, ?)",
+                (job_id, stage, json.dumps(data), time.time()),
+            )
+
+    def events_since(self, job_id, after_seq=0):
+        """Events of a job with a sequence number greater than after_seq."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT seq, stage, data, time FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after_seq),
+            ).fetchall()
+
+        return [
+            {"seq": seq, "stage": stage, "data": json.loads(data), "time": event_time}
+            for seq, stage, data, event_time in rows
+        ]
+
+    def get_status(self, job_id):
+        with self.lock:
+            row = self.conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+        return row[0] if row else None
+
+    def get_result(self, job_id):
+        with self.lock:
+            row = self.conn.execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+        return json.loads(row[0]) if row and row[0] else None
+
+    def get(self, job_id):
+        """
+        Snapshot of a job: status, attempts, error, the latest data of every stage
+        and the result once it is done. None if the job does not exist.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id, status, result, error, attempts, cancel_requested, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        # only the latest event of every stage is read and decoded
+        with self.lock:
+            events = self.conn.execute(
+                """
+                SELECT stage, data FROM job_events WHERE seq IN (
+                    SELECT MAX(seq) FROM job_events WHERE job_id = ? AND stage != 'status' GROUP BY stage
+                ) ORDER BY seq
+                """,
+                (job_id,),
+            ).fetchall()
+
+        stages = {stage: json.loads(data) for stage, data in events}
+
+        return {
+            "id": row[0],
+            "status": row[1],
+            "result": json.loads(row[2]) if row[2] else None,
+            "error": row[3],
+            "attempts": row[4],
+            "cancel_requested": bool(row[5]),
+            "created_at": row[6],
+            "updated_at": row[7],
+            "stages": stages,
+        }
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+
+def resolve_task(task):
+    """Import a task given as "module:function"."""
+    module_name, function_name = task.split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def run_job(db_path, job_id):
+    """
+    Worker process entry point: run one claimed job and record its outcome.
+    Returns the final status.
+    """
+    store = JobStore(db_path)
+    task, args = store.load(job_id)
+
+    def progress(stage, data):
+        if store.cancel_requested(job_id):
+            raise JobCancelled()
+        store.add_event(job_id, stage, data)
+
+    try:
+        result = resolve_task(task)(*args, progress=progress)
+    except JobCancelled:
+        store.finish(job_id, "cancelled")
+        return "cancelled"
+    except Exception as e:
+        traceback.print_exc()
+        store.finish(job_id, "failed", error=str(e))
+        return "failed"
+
+    store.finish(job_id, "done", result=result)
+    return "done"
+
+
+class JobManager:
+    """
+    Dispatches queued jobs to a pool of worker processes.
+
+    Jobs are persisted in a JobStore, so several API processes can share the queue and
+    queued jobs survive restarts. on_complete(job_id, result) runs in the API process
+    when a job finishes successfully.
+    """
+
+    def __init__(self, db_path=JOBS_DB, max_workers=JOB_WORKERS, on_complete=None):
+        self.db_path = db_path
+        self.store = JobStore(db_path)
+        self.max_workers = max_workers
+        self.on_complete = on_complete
+        self.running = 0
+        self.running_lock = threading.Lock()
+        self.executor = None
+
+    def start(self):
+        # spawn, since forking a process that already runs server threads is unsafe
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        self.store.requeue_orphans()
+        threading.Thread(target=self._dispatch_loop, daemon=True).start()
+
+    def submit(self, task, *args):
+        """Queue task ("module:function") to be called as task(*args, progress=...) and return the job id."""
+        return self.store.create(task, args)
+
+    def _dispatch_loop(self):
+        while True:
+            with self.running_lock:
+                has_capacity = self.running < self.max_workers
+
+            job_id = self.store.claim_next(os.getpid()) if has_capacity else None
+
+            if job_id is None:
+                time.sleep(DISPATCH_POLL_SECONDS)
+                continue
+
+            with self.running_lock:
+                self.running += 1
+
+            future = self.executor.submit(run_job, self.db_path, job_id)
+            future.add_done_callback(lambda f, job_id=job_id: self._job_finished(job_id, f))
+
+    def _job_finished(self, job_id, future):
+        with self.running_lock:
+            self.running -= 1
+
+        try:
+            status = future.result()
+        except Exception as e:
+            # the worker process itself died
+            self.store.finish(job_id, "failed", error=f"Worker crashed: {e}")
+            return
+
+        if status == "done" and self.on_complete:
+            self.on_complete(job_id, self.store.get_result(job_id))
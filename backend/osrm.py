@@ -0,0 +1,159 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+OSRM_BASE_URL = os.getenv("OSRM_BASE_URL", "http://router.project-osrm.org")
+OSRM_PROFILE = os.getenv("OSRM_PROFILE", "driving")
+OSRM_CONCURRENCY = int(os.getenv("OSRM_CONCURRENCY", "4"))
+OSRM_TIMEOUT = 30
+OSRM_RETRIES = 3
+OSRM_BACKOFF_FACTOR = 0.5
+
+# OSRM only does 100 sources and 100 destinations per table request
+CHUNK_SIZE = 100
+
+
+class OSRMClient:
+    """
+    Client for the OSRM table service.
+
+    Uses one pooled HTTP session with retries and exponential backoff, splits large
+    matrices into tiles of at most CHUNK_SIZE x CHUNK_SIZE and fetches the tiles
+    concurrently straight into preallocated NumPy arrays.
+    """
+
+    def __init__(self, base_url=OSRM_BASE_URL, profile=OSRM_PROFILE, concurrency=OSRM_CONCURRENCY,
+                 timeout=OSRM_TIMEOUT, retries=OSRM_RETRIES, chunk_size=CHUNK_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.profile = profile
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=OSRM_BACKOFF_FACTOR,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+        )
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def table(self, source_coordinates, destination_coordinates=None):
+        """
+        Distances in meters from every source to every destination as a float array.
+        Coordinates are (latitude, longitude) pairs. Unroutable pairs are NaN.
+        """
+        return self.tables([(source_coordinates, destination_coordinates)])[0]
+
+    def tables(self, requests_list, stats=None):
+        """
+        Several tables at once, all tiles sharing the same pool of connections.
+        requests_list is a list of (source_coordinates, destination_coordinates or None)
+        where None means a square matrix over the sources.
+        If `stats` is a dict, its "osrm_requests" count is increased by the number of requests made.
+        """
+        matrices = []
+        tiles = []
+
+        for source_coordinates, destination_coordinates in requests_list:
+            square = destination_coordinates is None
+            if square:
+                destination_coordinates = source_coordinates
+
+            matrix = np.full((len(source_coordinates), len(destination_coordinates)), np.nan)
+            matrices.append(matrix)
+
+            for row_start in range(0, len(source_coordinates), self.chunk_size):
+                for col_start in range(0, len(destination_coordinates), self.chunk_size):
+                    row_end = min(row_start + self.chunk_size, len(source_coordinates))
+                    col_end = min(col_start + self.chunk_size, len(destination_coordinates))
+
+                    tiles.append((
+                        source_coordinates[row_start:row_end],
+                        destination_coordinates[col_start:col_end],
+                        square and row_start == col_start,
+                        matrix[row_start:row_end, col_start:col_end],
+                    ))
+
+        if stats is not None:
+            stats["osrm_requests"] = stats.get("osrm_requests", 0) + len(tiles)
+
+        if len(tiles) == 1:
+            self.fetch_tile(*tiles[0])
+        elif tiles:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                # list() so that the first failing tile raises here
+                list(pool.map(lambda tile: self.fetch_tile(*tile), tiles))
+
+        return matrices
+
+    def fetch_tile(self, source_coordinates, destination_coordinates, same_points, out):
+        """Fetch one table request and write it into `out` (a view of the full matrix)."""
+        if same_points:
+            # Sources and destinations are the same, so just send coordinates once
+            coordinates = source_coordinates
+            params = {"annotations": "distance"}
+        else:
+            # Sources and destinations differ, so send both and specify which is which
+            coordinates = list(source_coordinates) + list(destination_coordinates)
+            n_sources = len(source_coordinates)
+            params = {
+                "annotations": "distance",
+                "sources": ";".join(map(str, range(n_sources))),
+                "destinations": ";".join(map(str, range(n_sources, len(coordinates)))),
+            }
+
+        coordinates_string = ";".join(f"{lon},{lat}" for lat, lon in coordinates)
+        url = f"{self.base_url}/table/v1/{self.profile}/{coordinates_string}"
+
+        try:
+            osrm_response = self.session.get(url, params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise Exception(f"OSRM API request failed: {e}")
+
+        # Check the HTTP status code
+        if osrm_response.status_code != 200:
+            raise Exception(f"OSRM API request failed with status code {osrm_response.status_code}")
+
+        try:
+            data = osrm_response.json()
+        except ValueError:
+            raise Exception("OSRM API returned invalid JSON")
+
+        # Check the OSRM response has a valid code
+        if data.get("code") != "Ok":
+            raise Exception(f"OSRM API returned an error: {data.get('code')} - {data.get('message', 'No message provided')}")
+
+        # Check the distances key actually exists
+        if "distances" not in data:
+            raise Exception("OSRM API response missing 'distances' key")
+
+        # null distances (unroutable pairs) become NaN
+        distance_data = np.array(data["distances"], dtype=np.float64)
+
+        # Check the matrix has the expected dimensions
+        if distance_data.shape != out.shape:
+            raise Exception(f"OSRM API returned a {distance_data.shape} distance matrix, expected {out.shape}")
+
+        out[:, :] = distance_data
+
+
+_client = None
+
+
+def get_client():
+    """Client shared by the whole process so connections are reused between uploads."""
+    global _client
+
+    if _client is None:
+        _client = OSRMClient()
+
+    return _client
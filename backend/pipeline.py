@@ -0,0 +1,239 @@
+from typing import Any
+
+import math
+
+import numpy as np
+import pandas as pd
+
+import bpn_osm_and_kmeans
+
+# Time-balanced grouping reads service minutes per stop from this column
+SERVICE_MINUTES_COLUMN = "Service Minutes"
+DEFAULT_SERVICE_MINUTES = 5.0
+
+# Re-routing a changed list starts from the previous routes, so it needs much less search time
+INCREMENTAL_TIME_BUDGET_SECONDS = 10
+
+
+def service_minutes(df, weight_column=None) -> pd.Series:
+    """Per-row service minutes from weight_column (default SERVICE_MINUTES_COLUMN), DEFAULT_SERVICE_MINUTES where missing."""
+    column = weight_column or SERVICE_MINUTES_COLUMN
+
+    if column not in df.columns:
+        return pd.Series(DEFAULT_SERVICE_MINUTES, index=df.index)
+
+    return pd.to_numeric(df[column], errors="coerce").fillna(DEFAULT_SERVICE_MINUTES)
+
+
+def spreadsheet_addresses(df) -> pd.Series:
+    """Full address of every row for geocoding, without the City or State where they are missing."""
+    return df["Address"].str.cat([df["City"].fillna(""), df["State"].fillna("")], sep=" ").str.strip()
+
+
+def run_pipeline(df, filename, number_of_groups, distance_backend=None, balance_by=None, weight_column=None, engine=None, solver_settings=None, progress=None) -> dict[str, Any]:
+    """
+    Geocode, group and route the rows of an uploaded spreadsheet.
+
+    progress(stage, data) is called as each stage finishes so callers can show
+    partial results: "rows_parsed", "geocoding", "addresses_geocoded",
+    "clusters_formed" and "routes_solved".
+
+    distance_backend is "osrm", "haversine" or "hybrid" (default DISTANCE_BACKEND).
+    balance_by is "stops" (default, same number of stops per group) or "time" (balance
+    service minutes from weight_column plus estimated travel minutes per group).
+    engine is "clusters" (default, group with k-means then route every group) or "vrp"
+    (one multi-vehicle routing model over all stops, warm-started from the k-means groups).
+    solver_settings override bpn_osm_and_kmeans.DEFAULT_SOLVER_SETTINGS for this upload.
+
+    Stops are grouped one by one, then stops of the same group within
+    COLOCATION_RADIUS_M of each other (e.g. several households at one address) are
+    routed as one location and expanded back to every stop in the routes and map;
+    "colocation_stats" tells how much that saved.
+    """
+    report = progress or (lambda stage, data: None)
+
+    total_rows = len(df)
+    report("rows_parsed", {"rows": total_rows, "columns": list(df.columns)})
+
+    if total_rows == 0:
+        return {"filename": filename, "columns": list(df.columns), "groups": [], "routes": []}
+
+    addresses = spreadsheet_addresses(df)
+
+    print("Calling geocode_addresses")
+    # getting the latitude and longitutde of all the locations
+    geocode_stats: dict[str, Any] = {}
+    geocoded_data = bpn_osm_and_kmeans.geocode_addresses(
+        addresses,
+        stats=geocode_stats,
+        progress=lambda done, total: report("geocoding", {"done": done, "total": total}),
+    )
+    print("geocoded_data: ", geocoded_data)
+    print("geocode_stats: ", geocode_stats)
+    report("addresses_geocoded", {"geocoded": len(geocoded_data), "geocode_stats": geocode_stats})
+
+    weights = None
+    if balance_by == "time":
+        minutes = service_minutes(df, weight_column).to_numpy()
+        weights = [minutes[entry["row"]] for entry in geocoded_data]
+
+    # Grouping every stop keeps the groups balanced even when many stops share an address
+    group_stats: dict[str, Any] = {}
+    stop_labels = bpn_osm_and_kmeans.get_groups(geocoded_data, number_of_groups, weights, group_stats)[0]
+
+    # Co-located stops of a group share one row and column of its distance matrix
+    colocation_stats: dict[str, Any] = {}
+    locations, location_of = bpn_osm_and_kmeans.collapse_colocated(geocoded_data, labels=stop_labels, stats=colocation_stats)
+    counts = [len(location["members"]) for location in locations]
+    print("colocation_stats: ", colocation_stats)
+
+    cluster_labels = np.zeros(len(locations), dtype=int)
+    cluster_labels[location_of] = stop_labels
+
+    route_stats: dict[str, Any] = {}
+    if engine == "vrp":
+        # one routing model over all stops decides the groups, starting from the k-means ones
+        cluster_labels, routes, map_data = bpn_osm_and_kmeans.generate_vrp_grouping(
+            locations, number_of_groups, cluster_labels, route_stats, distance_backend, solver_settings
+        )
+        group_stats = bpn_osm_and_kmeans.group_balance(cluster_labels, np.asarray(counts, dtype=np.float64), number_of_groups, "stops", counts)
+
+    groups: list[list[dict[str, Any]]] = [[] for _ in range(number_of_groups)]
+
+    for i in range(len(geocoded_data)):
+        location_dict = {"Location" : geocoded_data[i]["full_result"]}
+
+        group = int(cluster_labels[location_of[i]])
+
+        groups[group].append(location_dict)
+
+    print("group_stats: ", group_stats)
+    report("clusters_formed", {"groups": groups, "group_stats": group_stats, "colocation_stats": colocation_stats})
+
+    # Elbow method for kmeans
+    # elbow_method.elbow_method_graph(x)
+
+    # Solving the routes; map_data is what rendering.render_map draws
+    if engine != "vrp":
+        routes, map_data = bpn_osm_and_kmeans.generate_kmeans_grouping_graph(
+            locations, number_of_groups, cluster_labels, route_stats, distance_backend,
+            solver_settings=solver_settings,
+        )
+    report("routes_solved", {"routes": routes, "route_stats": route_stats})
+
+    return {
+        "filename": filename,
+        "columns": list(df.columns),
+        "groups": groups,
+        "geocode_stats": geocode_stats,
+        "group_stats": group_stats,
+        "colocation_stats": colocation_stats,
+        "routes": routes,
+        "route_stats": route_stats,
+        "map": map_data,
+    }
+
+
+def run_incremental(df, filename, grouping, distance_backend=None, progress=None) -> dict[str, Any]:
+    """
+    Re-group and re-route a changed spreadsheet starting from a saved grouping.
+
+    Stops that were already in the grouping keep their group and their place in its
+    route, removed stops are dropped, and new stops join the nearest group that still
+    has room (groups stay as even as balanced_kmeans makes them) and are inserted into
+    its route. Every route is then improved by a search seeded with it, within
+    INCREMENTAL_TIME_BUDGET_SECONDS. With the osrm backend the distance cache already
+    holds the pairs of unchanged stops, so only the new stops' rows and columns are fetched.
+
+    Reports the same stages and returns the same result as run_pipeline, plus the
+    number of kept, added and removed stops under "changes".
+    """
+    report = progress or (lambda stage, data: None)
+
+    if not grouping.get("routes"):
+        raise Exception("Saved grouping has no routes to start from, upload the spreadsheet instead")
+
+    number_of_groups = grouping["number_of_groups"]
+
+    total_rows = len(df)
+    report("rows_parsed", {"rows": total_rows, "columns": list(df.columns)})
+
+    geocode_stats: dict[str, Any] = {}
+    geocoded_data = bpn_osm_and_kmeans.geocode_addresses(
+        spreadsheet_addresses(df),
+        stats=geocode_stats,
+        progress=lambda done, total: report("geocoding", {"done": done, "total": total}),
+    )
+    print("geocode_stats: ", geocode_stats)
+    report("addresses_geocoded", {"geocoded": len(geocoded_data), "geocode_stats": geocode_stats})
+
+    # Where every previous stop was: group and position in that group's route
+    previous: dict[str, list[tuple[int, int]]] = {}
+    previous_points: list[list[list[float]]] = [[] for _ in range(number_of_groups)]
+    for route in grouping["routes"]:
+        for position, stop in enumerate(route["stops"]):
+            previous.setdefault(stop["Location"], []).append((route["group"], position))
+            previous_points[route["group"]].append([stop["latitude"], stop["longitude"]])
+
+    cluster_labels = np.full(len(geocoded_data), -1)
+    positions = np.full(len(geocoded_data), len(geocoded_data))
+    for i, entry in enumerate(geocoded_data):
+        matches = previous.get(entry["full_result"])
+        if matches:
+            cluster_labels[i], positions[i] = matches.pop(0)
+
+    added = np.flatnonzero(cluster_labels < 0)
+    removed = sum(len(matches) for matches in previous.values())
+    changes = {"kept": len(geocoded_data) - len(added), "added": len(added), "removed": removed}
+    print("changes: ", changes)
+
+    # New stops go to the nearest previous group center, filling every group up to the balanced size
+    if len(added):
+        x = np.array([[entry["latitude"], entry["longitude"]] for entry in geocoded_data])
+        centers = np.array([
+            np.mean(points, axis=0) if points else x.mean(axis=0)
+            for points in previous_points
+        ])
+        cost = ((x[added][:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+
+        kept_sizes = np.bincount(cluster_labels[cluster_labels >= 0], minlength=number_of_groups)
+        target = math.ceil(len(geocoded_data) / number_of_groups)
+        sizes = np.maximum(target - kept_sizes, 0)
+
+        cluster_labels[added] = bpn_osm_and_kmeans.balanced_assignment(cost, sizes)
+
+    # Order every group's stops as in its previous route, new stops last, so the kept
+    # part of the previous route is nodes 0..k-1 of the group's distance matrix
+    order = np.lexsort((positions, cluster_labels))
+    geocoded_data = [geocoded_data[i] for i in order]
+    cluster_labels = cluster_labels[order]
+
+    kept_sizes = np.bincount(cluster_labels[positions[order] < len(order)], minlength=number_of_groups)
+    initial_routes = {group: list(range(kept)) for group, kept in enumerate(kept_sizes) if kept}
+
+    group_stats = bpn_osm_and_kmeans.group_balance(cluster_labels, np.ones(len(cluster_labels)), number_of_groups, "stops")
+
+    groups: list[list[dict[str, Any]]] = [[] for _ in range(number_of_groups)]
+    for entry, group in zip(geocoded_data, cluster_labels):
+        groups[int(group)].append({"Location": entry["full_result"]})
+
+    report("clusters_formed", {"groups": groups, "group_stats": group_stats, "changes": changes})
+
+    route_stats: dict[str, Any] = {}
+    routes, map_data = bpn_osm_and_kmeans.generate_kmeans_grouping_graph(
+        geocoded_data, number_of_groups, cluster_labels, route_stats, distance_backend,
+        initial_routes, INCREMENTAL_TIME_BUDGET_SECONDS,
+    )
+    report("routes_solved", {"routes": routes, "route_stats": route_stats})
+
+    return {
+        "filename": filename,
+        "columns": list(df.columns),
+        "groups": groups,
+        "geocode_stats": geocode_stats,
+        "group_stats": group_stats,
+        "changes": changes,
+        "routes": routes,
+        "route_stats": route_stats,
+        "map": map_data,
+    }
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+from io import BytesIO
+
+import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", "render_cache")
+
+MAP_FORMATS = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "geojson": "application/geo+json",
+}
+
+
+def grouping_hash(grouping):
+    """Stable hash of a grouping's points, labels and routes."""
+    canonical = json.dumps(grouping, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def cluster_colors(n_clusters):
+    cmap = matplotlib.colormaps['tab20']
+    return [cmap(i / n_clusters) for i in range(n_clusters)]
+
+
+def render_image(grouping, fmt):
+    """
+    Scatter of the locations colored by group with every group's route drawn over it.
+    Uses the Agg canvas directly, so no GUI backend or pyplot global state is involved.
+    """
+    points = grouping["points"]
+    labels = grouping["labels"]
+    n_clusters = max(labels) + 1 if labels else 1
+    colors = cluster_colors(n_clusters)
+
+    figure = Figure(figsize=(10, 8))
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+
+    axes.scatter(
+        [longitude for latitude, longitude in points],
+        [latitude for latitude, longitude in points],
+        c=[colors[label] for label in labels],
+        s=12,
+    )
+
+    for cluster, route in grouping["routes"].items():
+        axes.plot(
+            [longitude for latitude, longitude in route],
+            [latitude for latitude, longitude in route],
+            color=colors[int(cluster)],
+            linewidth=1,
+        )
+
+    axes.set_xlabel("Longitude")
+    axes.set_ylabel("Latitude")
+    axes.set_aspect("equal", adjustable="datalim")
+
+    output = BytesIO()
+    figure.savefig(output, format=fmt, bbox_inches="tight")
+    return output.getvalue()
+
+
+def render_geojson(grouping):
+    """A Point feature per location and a LineString per route, with the group as a property."""
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [longitude, latitude]},
+            "properties": {"group": label},
+        }
+        for (latitude, longitude), label in zip(grouping["points"], grouping["labels"])
+    ]
+
+    for cluster, route in grouping["routes"].items():
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "LineString", "coordinates": [[longitude, latitude] for latitude, longitude in route]},
+            "properties": {"group": int(cluster)},
+        })
+
+    return json.dumps({"type": "FeatureCollection", "features": features}).encode("utf-8")
+
+
+def render_map(grouping, fmt="png"):
+    """
+    Map of a grouping as PNG, SVG or GeoJSON bytes.
+
+    grouping is {"points": [[latitude, longitude], ...], "labels": [group, ...],
+    "routes": {group: [[latitude, longitude], ...]}}. Output is cached on disk under
+    the grouping's hash, so showing the same grouping again only reads a file.
+    """
+    if fmt not in MAP_FORMATS:
+        raise ValueError(f"Unknown map format: {fmt}")
+
+    os.makedirs(RENDER_CACHE_DIR, exist_ok=True)
+    path = os.path.join(RENDER_CACHE_DIR, f"{grouping_hash(grouping)}.{fmt}")
+
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    if fmt == "geojson":
+        data = render_geojson(grouping)
+    else:
+        data = render_image(grouping, fmt)
+
+    # write then rename so concurrent readers never see a partial file
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+    return data
@@ -2,19 +2,41 @@ import { useState, useEffect } from "react";
 import "./App.css";
 import DragDropDemo from "./DragDropDemo";
 
+type RouteStop = {
+  Location: string;
+  latitude: number;
+  longitude: number;
+};
+
+type GroupRoute = {
+  group: number;
+  solved: boolean;
+  closed?: boolean;
+  stops: RouteStop[];
+  leg_distances?: number[];
+  cumulative_distances?: number[];
+  distance: number | null;
+  objective: number | null;
+};
+
 type TableResponse = {
   filename: string;
   columns: string[];
   groups: Record<string, any>[][];
+  routes?: GroupRoute[];
 };
 
-type SavedGrouping = {
+type GroupingSummary = {
   id: string;
   filename: string;
   number_of_groups: number;
+  created_at: string;
+};
+
+type SavedGrouping = GroupingSummary & {
   columns: string[];
   groups: Record<string, any>[][];
-  created_at: string;
+  routes?: GroupRoute[] | null;
 };
 
 const API_BASE_URL =
@@ -26,7 +48,8 @@ function App() {
   const [table, setTable] = useState<TableResponse | null>(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
-  const [savedGroupings, setSavedGroupings] = useState<SavedGrouping[]>([]);
+  const [savedGroupings, setSavedGroupings] = useState<GroupingSummary[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [showSaved, setShowSaved] = useState(false);
 
   // ------------------------------
@@ -36,12 +59,16 @@ function App() {
     fetchSavedGroupings();
   }, []);
 
-  const fetchSavedGroupings = async () => {
+  // Summaries only, one page at a time; pass the cursor to load older ones
+  const fetchSavedGroupings = async (before: string | null = null) => {
     try {
-      const res = await fetch(`${API_BASE_URL}/groupings`);
+      const query = before ? `?before=${encodeURIComponent(before)}` : "";
+      const res = await fetch(`${API_BASE_URL}/groupings${query}`);
       if (res.ok) {
         const data = await res.json();
-        setSavedGroupings(data.groupings || []);
+        const page: GroupingSummary[] = data.groupings || [];
+        setSavedGroupings((prev) => (before ? [...prev, ...page] : page));
+        setNextCursor(data.next_cursor ?? null);
       }
     } catch (err) {
       console.error("Failed to fetch saved groupings:", err);
@@ -104,13 +131,25 @@ function App() {
   // ------------------------------
   // Load saved grouping
   // ------------------------------
-  const handleLoadGrouping = (grouping: SavedGrouping) => {
-    setTable({
-      filename: grouping.filename,
-      columns: grouping.columns,
-      groups: grouping.groups,
-    });
-    setShowSaved(false);
+  const handleLoadGrouping = async (id: string) => {
+    try {
+      // the browser revalidates with the ETag, so reloading a grouping is cheap
+      const res = await fetch(`${API_BASE_URL}/groupings/${id}`);
+      if (!res.ok) {
+        throw new Error(`Failed with status ${res.status}`);
+      }
+
+      const grouping = (await res.json()).grouping as SavedGrouping;
+      setTable({
+        filename: grouping.filename,
+        columns: grouping.columns,
+        groups: grouping.groups,
+        routes: grouping.routes ?? undefined,
+      });
+      setShowSaved(false);
+    } catch (err: any) {
+      alert(`Error loading grouping: ${err.message}`);
+    }
   };
 
   // ------------------------------
@@ -201,7 +240,7 @@ function App() {
           onClick={() => setShowSaved(!showSaved)}
           style={{ marginBottom: "1rem" }}
         >
-          {showSaved ? "Hide" : "Show"} Saved Groupings ({savedGroupings.length})
+          {showSaved ? "Hide" : "Show"} Saved Groupings ({savedGroupings.length}{nextCursor ? "+" : ""})
         </button>
 
         {showSaved && (
@@ -228,7 +267,7 @@ function App() {
                         </div>
                       </div>
                       <div style={{ display: "flex", gap: "10px" }}>
-                        <button onClick={() => handleLoadGrouping(grouping)}>
+                        <button onClick={() => handleLoadGrouping(grouping.id)}>
                           Load
                         </button>
                         <button
@@ -243,6 +282,11 @@ function App() {
                 ))}
               </ul>
             )}
+            {nextCursor && (
+              <button onClick={() => fetchSavedGroupings(nextCursor)}>
+                Load more
+              </button>
+            )}
           </div>
         )}
       </div>
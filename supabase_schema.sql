@@ -7,11 +7,19 @@ CREATE TABLE groupings (
   number_of_groups INTEGER NOT NULL,
   columns TEXT[] NOT NULL,
   groups JSONB NOT NULL,
+  routes JSONB,
   created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Existing databases: add the solved routes column
+-- ALTER TABLE groupings ADD COLUMN IF NOT EXISTS routes JSONB;
+
 -- Create index for faster queries
-CREATE INDEX idx_groupings_created_at ON groupings(created_at DESC);
+CREATE INDEX idx_groupings_created_at_id ON groupings(created_at DESC, id DESC);
+
+-- Existing databases: page by (created_at, id) instead of created_at alone
+-- DROP INDEX IF EXISTS idx_groupings_created_at;
+-- CREATE INDEX IF NOT EXISTS idx_groupings_created_at_id ON groupings(created_at DESC, id DESC);
 
 -- Enable Row Level Security (optional - allows anyone to read/write for now)
 ALTER TABLE groupings ENABLE ROW LEVEL SECURITY;